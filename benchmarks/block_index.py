@@ -0,0 +1,115 @@
+# benchmarks/block_index.py - Field-level check of Section 2 block assignment
+#
+#   python -m benchmarks.block_index [path/to/form.pdf] [--synthetic --meetings 2 --seed 0]
+#
+# Every dog's Section 2 block opens with its box and trainer
+# ("3. 0kg (3) bk 2 D TROY VELLA Horse: …"), which the header row also
+# carries, so whether a dog got its own block can be checked without the
+# name matching under test. For the block index used by
+# parse_race_card_stream and for the multi-anchor search it replaced
+# (_find_block over the whole card), this counts the dogs whose block is
+# their own. It then compares each parsed dog's Section 2 values and
+# recent-run count with a fresh extraction from its own block, field by
+# field. Exits with status 1 if any dog has the wrong block or values.
+import argparse
+import contextlib
+import io
+import os
+import sys
+
+import pandas as pd
+
+from benchmarks.synthetic import generate_card
+from src.extract import extract_text_from_pdf
+from src.parser import (
+    _SECTION2_COLS, _build_block_index, _build_fuzzy_candidates, _extract_fields,
+    _find_block, _iter_races, _norm, _parse_headers, parse_race_card_stream,
+)
+
+def _is_own(block, box, trainer):
+    """True if the block's opening line carries the dog's box and its trainer's surname."""
+    if not block:
+        return False
+    head = block[:160]
+    surname = str(trainer).split()[-1].upper() if str(trainer).strip() else ""
+    return (f"({box})" in head or f"{box}. " in head) and surname in head
+
+def _index_blocks(lines):
+    """Block per dog, in parse order, found the way _enrich_race finds it (per-race index, then scan)."""
+    blocks = []
+    for race_dogs, race_lines in _iter_races(lines):
+        txt = _norm("\n".join(race_lines) + "\n")
+        index = _build_block_index(txt)
+        names = [d["DogName"] for d in race_dogs]
+        for name in names:
+            span = index.get(name) or index.get(name[1:])
+            blocks.append(txt[span[0]:span[1]] if span else _find_block(txt, name, names, None, index))
+    return blocks
+
+def _search_blocks(text, dogs):
+    """Block per dog from the multi-anchor search over the whole card (the pre-index lookup)."""
+    txt = _norm(text)
+    names = dogs["DogName"].tolist()
+    candidates = _build_fuzzy_candidates(txt)
+    return [_find_block(txt, name, names, candidates) for name in names]
+
+def _value(v):
+    if v is None or (not isinstance(v, (list, dict)) and pd.isna(v)):
+        return None
+    return str(v)
+
+def field_mismatches(dogs, runs, blocks, header_cols=()):
+    """
+    (dog name, field, parsed, expected) for every value that differs from
+    the dog's own block. A header column the block leaves empty keeps its
+    header value, as in _enrich_race, so it is not compared.
+    """
+    n_runs = runs.groupby("DogId").size()
+    out = []
+    for (_, row), block in zip(dogs.iterrows(), blocks):
+        expected = _extract_fields(block) if block else {}
+        for col in _SECTION2_COLS:
+            got, want = _value(row.get(col)), _value(expected.get(col))
+            if want in (None, "") and col in header_cols:
+                continue
+            if want == "":
+                want = None
+            if got != want:
+                out.append((row["DogName"], col, got, want))
+        got, want = int(n_runs.get(row["DogId"], 0)), len(expected.get("RecentRuns") or [])
+        if got != want:
+            out.append((row["DogName"], "runs", got, want))
+    return out
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Check that every dog is enriched from its own Section 2 block")
+    ap.add_argument("pdf", nargs="?", default=os.path.join("data", "RICHG1910form.pdf"))
+    ap.add_argument("--synthetic", action="store_true", help="Check a generated card instead of the PDF")
+    ap.add_argument("--meetings", type=int, default=2)
+    ap.add_argument("--seed", type=int, default=0)
+    args = ap.parse_args(argv)
+
+    text = generate_card(meetings=args.meetings, seed=args.seed) if args.synthetic else extract_text_from_pdf(args.pdf)
+    lines = text.splitlines()
+    with contextlib.redirect_stdout(io.StringIO()):
+        dogs, runs = parse_race_card_stream(lines)
+        indexed = _index_blocks(lines)
+        searched = _search_blocks(text, dogs)
+    print(f"📄 {'synthetic card' if args.synthetic else os.path.basename(args.pdf)}: {len(dogs)} dogs")
+
+    keys = list(zip(dogs["Box"], dogs["Trainer"]))
+    own_index = sum(_is_own(b, *k) for b, k in zip(indexed, keys))
+    own_search = sum(_is_own(b, *k) for b, k in zip(searched, keys))
+    print(f"🔎 Own block (box + trainer): index {own_index}/{len(dogs)}, whole-card search {own_search}/{len(dogs)}")
+
+    bad = field_mismatches(dogs, runs, indexed, set(_parse_headers(lines).columns))
+    for name, col, got, want in bad[:20]:
+        print(f"   {name}: {col} parsed {got!r}, own block {want!r}")
+    if own_index == len(dogs) and not bad:
+        print("✅ Every dog's Section 2 fields come from its own block")
+        return 0
+    print(f"❌ {len(dogs) - own_index} dogs without their own block, {len(bad)} field values differ")
+    return 1
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,91 @@
+# benchmarks/field_extractor.py - Per-block cost of the single-pass field scan
+#
+#   python -m benchmarks.field_extractor [path/to/form.pdf] [--repeat N]
+#
+# Times src.parser._scan_block against the per-pattern search it replaced
+# (one .search per _FIELD_RX key, a word loop for the tokens, re.split for
+# run starts) on every dog block of the card, and checks both agree.
+import argparse
+import os
+import re
+import time
+
+from src.extract import extract_text_from_pdf
+from src.parser import (
+    _FIELD_RX, _KNOWN_DISTANCES, _TRACK_WORDS,
+    _build_block_index, _extract_fields, _norm, _scan_block,
+)
+
+def _reference_scan(block):
+    """The pre-scan approach, returning what _scan_block returns."""
+    found = {}
+    for key, rx in _FIELD_RX.items():
+        if key == "sire_dam":
+            continue
+        m = rx.search(block)
+        if m:
+            found[key] = m
+
+    tokens = {}
+    words = block.split()
+    for i, w in enumerate(words):
+        nxt = words[i + 1] if i + 1 < len(words) else ""
+        prev = words[i - 1].lower() if i > 0 else ""
+        if re.fullmatch(r"\d{3}m", w) and int(w[:-1]) in _KNOWN_DISTANCES:
+            tokens["distance"] = int(w[:-1])
+        if w.lower() == "prize" and re.match(r"^\$?\d[\d,]*(?:\.\d+)?$", nxt):
+            tokens["prize"] = nxt
+        if w.lower() == "margin" and re.match(r"^[\d.]+$", nxt):
+            tokens["margin"] = nxt
+        if w.lower() == "time" and prev == "race" and re.match(r"^\d+:\d{2}\.\d{2}$", nxt):
+            tokens["racetime"] = nxt
+        if w.lower() == "time" and prev == "sec" and re.match(r"^\d{1,2}\.\d{2}$", nxt):
+            tokens["sectime"] = nxt
+        if w.lower() in _TRACK_WORDS:
+            tokens["track"] = w
+
+    starts = [m.start() for m in re.finditer(r"(?=(?:\d{1,2}(?:st|nd|rd|th)\s+of\s+\d+))", block)]
+    return found, tokens, starts
+
+def _same(a, b):
+    fa, ta, sa = a
+    fb, tb, sb = b
+    return ({k: m.span() for k, m in fa.items()} == {k: m.span() for k, m in fb.items()}
+            and ta == tb and sa == sb)
+
+def _per_block_us(fn, blocks, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        for block in blocks:
+            fn(block)
+        best = min(best, time.perf_counter() - t0)
+    return best / len(blocks) * 1e6
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Benchmark the Section 2 field scan")
+    ap.add_argument("pdf", nargs="?", default=os.path.join("data", "RICHG1910form.pdf"))
+    ap.add_argument("--repeat", type=int, default=5)
+    args = ap.parse_args(argv)
+
+    text = _norm(extract_text_from_pdf(args.pdf))
+    blocks = [text[a:b] for a, b in _build_block_index(text).values()]
+    if not blocks:
+        print("❌ No dog blocks found.")
+        return
+    print(f"📄 {os.path.basename(args.pdf)}: {len(blocks)} blocks, "
+          f"{sum(map(len, blocks)) // len(blocks)} chars on average")
+
+    mismatched = sum(not _same(_scan_block(b), _reference_scan(b)) for b in blocks)
+    print("✅ Scan matches per-pattern search" if not mismatched
+          else f"❌ {mismatched} blocks differ from per-pattern search")
+
+    ref = _per_block_us(_reference_scan, blocks, args.repeat)
+    new = _per_block_us(_scan_block, blocks, args.repeat)
+    full = _per_block_us(_extract_fields, blocks, args.repeat)
+    print(f"⏱️ per-pattern search: {ref:8.1f} µs/block")
+    print(f"⏱️ single-pass scan:   {new:8.1f} µs/block ({ref / new:.1f}x)")
+    print(f"⏱️ _extract_fields:    {full:8.1f} µs/block")
+
+if __name__ == "__main__":
+    main()
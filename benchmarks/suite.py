@@ -0,0 +1,207 @@
+# benchmarks/suite.py - Timings for the pipeline hot paths, with a regression gate
+#
+#   python -m benchmarks.suite run [--scales 1,10,100] [--save NAME] [--compare NAME]
+#   python -m benchmarks.suite run --synthetic --scales 10000,100000 [--history 5] [--seed 0]
+#   python -m benchmarks.suite compare BASELINE CURRENT [--threshold 10]
+#
+# Stages: PDF text extraction, the header phase of the parser alone, the
+# whole parse_race_card_stream (header scan plus per-race Section 2
+# enrichment, the path main.py runs whether or not the parse cache is on),
+# compute_features, generate_trifecta_table, the exotics probability table
+# (every trifecta/first-four order) and 10,000 simulated runnings of every
+# race (simulate_races). Each runs
+# on the sample card (x1) and on cards scaled up from it; extraction only
+# runs on the PDF itself. Results are JSON files under benchmarks/baselines/
+# (NAME or a path; "baseline" is the committed reference), and compare exits with status 1 when any stage's median
+# is more than --threshold percent slower than the baseline. With
+# --synthetic the cards come from benchmarks.synthetic instead and each
+# scale is a number of runners (10-race, 8-dog meetings, rounded up).
+import argparse
+import contextlib
+import datetime
+import io
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+
+from benchmarks.synthetic import generate_card, meetings_for_runners
+from src.extract import extract_text_from_pdf
+from src.features import compute_features, generate_trifecta_table
+from src.parser import _parse_headers, parse_race_card_stream
+from src.probability import exotics
+from src.simulate import simulate_races
+
+BASELINE_DIR = os.path.join("benchmarks", "baselines")
+DEFAULT_PDF = os.path.join("data", "RICHG1910form.pdf")
+STAGES = ["extract", "header", "parse", "features", "trifecta", "exotics", "simulate"]
+
+def _scaled_card(text, scale):
+    """The sample card repeated scale times (each copy keeps its own race headers)."""
+    return text * scale
+
+def _bench(fn, min_time, max_rounds):
+    """pytest-benchmark style: repeat fn until min_time has passed (at least once)."""
+    times = []
+    start = time.perf_counter()
+    while len(times) < max_rounds:
+        with contextlib.redirect_stdout(io.StringIO()):
+            t0 = time.perf_counter()
+            result = fn()
+            times.append(time.perf_counter() - t0)
+        if time.perf_counter() - start >= min_time:
+            break
+    return result, {
+        "min": min(times),
+        "max": max(times),
+        "mean": statistics.fmean(times),
+        "median": statistics.median(times),
+        "stddev": statistics.stdev(times) if len(times) > 1 else 0.0,
+        "rounds": len(times),
+    }
+
+def _synthetic_card(runners_total, history=5, seed=0):
+    return generate_card(meetings=meetings_for_runners(runners_total), history=history, seed=seed)
+
+def run_suite(pdf_path, scales, stages, min_time=1.0, max_rounds=20, synthetic=None):
+    """
+    Benchmark records for every (stage, scale), in run order. synthetic is
+    None for PDF-based cards, or a dict of benchmarks.synthetic options
+    (history, seed) to generate a card of `scale` runners instead.
+    """
+    records = []
+    prefix = "n" if synthetic is not None else "x"
+
+    def record(stage, scale, fn, size=None):
+        result, stats = _bench(fn, min_time, max_rounds)
+        records.append({"name": f"{stage}[{prefix}{scale}]", "stage": stage, "scale": scale,
+                        "dogs": size, "stats": stats})
+        print(f"⏱️ {stage:<9} {prefix}{scale:<7} median {stats['median'] * 1000:10.1f} ms "
+              f"({stats['rounds']} rounds)")
+        return result
+
+    if synthetic is None:
+        base_text = extract_text_from_pdf(pdf_path, use_cache=False)
+        if "extract" in stages:
+            record("extract", 1, lambda: extract_text_from_pdf(pdf_path, use_cache=False))
+
+    for scale in scales:
+        if synthetic is None:
+            text = _scaled_card(base_text, scale)
+        else:
+            text = _synthetic_card(scale, **synthetic)
+        lines = text.splitlines()
+        with contextlib.redirect_stdout(io.StringIO()):
+            dogs, runs = parse_race_card_stream(lines)
+            scored = compute_features(dogs, runs=runs)
+        n = len(dogs)
+
+        if "header" in stages:
+            record("header", scale, lambda: _parse_headers(lines), n)
+        if "parse" in stages:
+            record("parse", scale, lambda: parse_race_card_stream(lines), n)
+        if "features" in stages:
+            record("features", scale, lambda: compute_features(dogs, runs=runs), n)
+        if "trifecta" in stages:
+            record("trifecta", scale, lambda: generate_trifecta_table(scored), n)
+        if "exotics" in stages:
+            record("exotics", scale, lambda: exotics(scored), n)
+        if "simulate" in stages:
+            record("simulate", scale, lambda: simulate_races(scored, n_sims=10_000), n)
+    return records
+
+def _resolve(name):
+    if os.path.exists(name) or name.endswith(".json"):
+        return name
+    return os.path.join(BASELINE_DIR, f"{name}.json")
+
+def save_results(records, name, pdf_path):
+    path = _resolve(name)
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    payload = {
+        "datetime": datetime.datetime.now().isoformat(timespec="seconds"),
+        "machine_info": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+        },
+        "pdf": os.path.basename(pdf_path),
+        "benchmarks": records,
+    }
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(payload, f, indent=2)
+    print(f"💾 Saved results → {path}")
+    return path
+
+def load_results(name):
+    with open(_resolve(name), encoding="utf-8") as f:
+        return json.load(f)["benchmarks"]
+
+def compare(baseline, current, threshold=10.0):
+    """Print median changes per benchmark; True if none regressed beyond threshold %."""
+    base = {b["name"]: b for b in baseline}
+    ok = True
+    print(f"{'benchmark':<20} {'baseline ms':>12} {'current ms':>12} {'change':>9}")
+    for b in current:
+        old = base.get(b["name"])
+        new_ms = b["stats"]["median"] * 1000
+        if old is None:
+            print(f"{b['name']:<20} {'-':>12} {new_ms:12.1f} {'new':>9}")
+            continue
+        old_ms = old["stats"]["median"] * 1000
+        change = (new_ms / old_ms - 1) * 100 if old_ms else 0.0
+        flag = ""
+        if change > threshold:
+            ok = False
+            flag = "  ❌"
+        print(f"{b['name']:<20} {old_ms:12.1f} {new_ms:12.1f} {change:+8.1f}%{flag}")
+    print("✅ No regressions" if ok else f"❌ Regression above {threshold:g}%")
+    return ok
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Greyhound Analytics benchmarks")
+    sub = ap.add_subparsers(dest="command", required=True)
+
+    run = sub.add_parser("run", help="Run the benchmarks and save the results")
+    run.add_argument("--pdf", default=DEFAULT_PDF)
+    run.add_argument("--scales", default="1,10,100",
+                     help="Comma-separated card multiples (e.g. 1,10,100,1000)")
+    run.add_argument("--stages", default=",".join(STAGES))
+    run.add_argument("--min-time", type=float, default=1.0,
+                     help="Seconds to keep repeating each benchmark (default: 1.0)")
+    run.add_argument("--max-rounds", type=int, default=20)
+    run.add_argument("--synthetic", action="store_true",
+                     help="Benchmark generated cards; scales are then runner counts (e.g. 10000,100000)")
+    run.add_argument("--history", type=int, default=5, help="Recent runs per synthetic dog at most")
+    run.add_argument("--seed", type=int, default=0, help="Synthetic card seed")
+    run.add_argument("--save", default="latest", help="Result name under benchmarks/baselines/, or a path")
+    run.add_argument("--compare", help="Baseline to compare against when done")
+    run.add_argument("--threshold", type=float, default=10.0,
+                     help="Allowed median slowdown in percent (default: 10)")
+
+    cmp_ = sub.add_parser("compare", help="Compare two saved results")
+    cmp_.add_argument("baseline")
+    cmp_.add_argument("current")
+    cmp_.add_argument("--threshold", type=float, default=10.0)
+
+    args = ap.parse_args(argv)
+    if args.command == "compare":
+        return 0 if compare(load_results(args.baseline), load_results(args.current), args.threshold) else 1
+
+    scales = [int(s) for s in args.scales.split(",") if s]
+    stages = [s for s in args.stages.split(",") if s]
+    unknown = set(stages) - set(STAGES)
+    if unknown:
+        ap.error(f"unknown stages: {', '.join(sorted(unknown))}")
+
+    synthetic = {"history": args.history, "seed": args.seed} if args.synthetic else None
+    records = run_suite(args.pdf, scales, stages, args.min_time, args.max_rounds, synthetic)
+    save_results(records, args.save, "synthetic" if args.synthetic else args.pdf)
+    if args.compare:
+        return 0 if compare(load_results(args.compare), records, args.threshold) else 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,204 @@
+# benchmarks/synthetic.py - Seeded synthetic race cards for scale testing
+#
+#   python -m benchmarks.synthetic OUT.txt [--meetings 40] [--races 12] [--runners 8]
+#                                          [--history 5] [--seed 0] [--date 2025-10-19]
+#
+# Emits form text in the layout src/parser.py reads from the PDFs: a
+# "Race No" header per race (_HEADER_RE), the header table rows (_DOG_RE),
+# then one Section 2 block per dog (the "NAME j50s j350s t50s t350s"
+# heading, the stats lines _FIELD_RX looks for and up to --history recent
+# runs in the _RUN_LINE layout). Track names, class lines and "GR" grades
+# are spelled as on the real cards. Cards are generated line by line, so
+# iter_card_lines can feed parse_race_card_stream at any size without the
+# text ever being held in memory. The same seed gives the same card.
+import argparse
+import datetime
+import sys
+
+import numpy as np
+
+# Track names as both the race headers and the run lines print them
+TRACKS = [
+    "RICHMOND", "WENTWORTH PARK", "ALBION PARK", "SANDOWN PARK", "GOSFORD", "DAPTO",
+    "BATHURST", "GRAFTON", "MANDURAH", "CANNINGTON", "DARWIN", "HORSHAM",
+    "WARRNAMBOOL", "TRARALGON", "BALLARAT", "THE GARDENS",
+]
+DISTANCES = [300, 320, 380, 401, 457, 515, 520, 595, 600, 715]
+# Race class line under the header and the run-line "GR" spelling of the same grade
+GRADES = [("Maiden", "MDN"), ("5th Grade", "5"), ("4th/5th Grade", "4/5"), ("4th Grade", "4"),
+          ("3rd/4th Grade", "3/4"), ("3rd Grade", "3")]
+COLOURS = ["bk", "bd", "bdl", "f", "w", "bl", "dk bdl", "blu"]
+
+_NAME_A = [
+    "ASTON", "BISTRO", "CEDAR", "DAWN", "EMPIRE", "FEDERAL", "GRAVEL", "HOOKED", "IRON", "JET",
+    "KAROONA", "LUNA", "MIDNIGHT", "NEAT", "OAKS", "PHOENIX", "QUAD", "ROYAL", "SUPREME", "TURBO",
+    "URBAN", "VIVID", "WOOPI", "ZIPPING", "BRILLIANT", "COSMIC", "DUSTY", "FANTASTIC", "GOLDEN", "LOCK",
+]
+_NAME_B = [
+    "ARLO", "BANJO", "CHARM", "DUST", "EDDIE", "FLASH", "GIN", "HURRY", "JOE", "KADE",
+    "LEGEND", "MOON", "NELLIE", "OPAL", "PRINCE", "RONNIE", "RUPEE", "STAR", "TIGER", "TODD",
+    "VALLEY", "WILMA", "XADEN", "YALE", "ROCKET", "STORM", "BULLET", "MAGIC", "SHADOW", "FLYER",
+]
+_FIRST = ["Adam", "Troy", "Walter", "Joanne", "Antonio", "Luke", "Andrew", "Billy", "Todd", "Valerie",
+          "Guiseppe", "Anthony", "Sharon", "Peter", "Kylie"]
+_LAST = ["Campton", "Vella", "King", "Zammit", "Teofilo", "Brown", "Bell", "Stockdale", "Barnes",
+         "Denardo", "Saab", "Harris", "Allan", "Frost", "Morgan"]
+_RACE_WORDS = ["LADBROKES", "QUICK", "MULTI", "DELTA", "RENT", "CAR", "WICK", "COFFEE", "STEELINE",
+               "BISTRO", "DINNER", "SPRINT", "STAYERS", "CUP", "PLATE"]
+
+_SUFFIX = {1: "st", 2: "nd", 3: "rd"}
+
+def _ordinal(n):
+    return f"{n}{'th' if 10 <= n % 100 <= 20 else _SUFFIX.get(n % 10, 'th')}"
+
+def _person(rng):
+    return f"{rng.choice(_FIRST)} {rng.choice(_LAST)}"
+
+def _dog_names(rng, n):
+    """n distinct two-word names (upper case, letters only, as _DOG_RE needs)."""
+    pairs = rng.choice(len(_NAME_A) * len(_NAME_B), size=n, replace=False)
+    return [f"{_NAME_A[p // len(_NAME_B)]} {_NAME_B[p % len(_NAME_B)]}" for p in pairs]
+
+def _race_time(seconds):
+    return f"{int(seconds // 60)}:{seconds % 60:05.2f}"
+
+def _runner(rng, box, name, history, distance):
+    """One runner's career figures and its recent runs (most recent first)."""
+    starts = int(rng.choice([0, 1, 3, rng.integers(4, 60)], p=[0.1, 0.1, 0.1, 0.7]))
+    places = int(rng.binomial(starts, 0.25))
+    wins = int(rng.binomial(starts - places, 0.2))
+    speed = rng.normal(17.4, 0.35)  # m/s over the whole trip
+    runs = []
+    day = int(rng.integers(3, 10))
+    for _ in range(min(starts, history)):
+        field = int(rng.integers(6, 9))
+        dist = int(distance if rng.random() < 0.6 else rng.choice(DISTANCES))
+        pos = int(rng.integers(1, field + 1))
+        runs.append({
+            "pos": pos, "field": field, "days_ago": day, "distance": dist,
+            "margin": round(float(rng.exponential(2.5)), 1) + (0.1 if pos > 1 else 0.0),
+            "racetime": dist / (speed + rng.normal(0, 0.2)),
+            "sectime": rng.normal(5.4, 0.25) * min(dist, 400) / 320,
+            "bp": int(rng.integers(1, 9)),
+            "odds": round(float(rng.gamma(2.0, 4.0)) + 1.2, 1),
+            "grade": GRADES[rng.integers(len(GRADES))][1],
+        })
+        day += int(rng.integers(4, 15))
+    return {
+        "box": box, "name": name, "trainer": _person(rng), "owner": _person(rng),
+        "sexage": f"{rng.integers(1, 5)}{rng.choice(['d', 'b'])}",
+        "colour": str(rng.choice(COLOURS)),
+        "sire": f"{rng.choice(_NAME_A)} {rng.choice(_NAME_B)}",
+        "dam": f"{rng.choice(_NAME_B)} {rng.choice(_NAME_A)}",
+        "starts": starts, "wins": wins, "places": places,
+        "prize": wins * int(rng.integers(900, 3000)) + places * 300,
+        "form": "".join(str(min(r["pos"], 9)) for r in reversed(runs[:5])),
+        "dlr": runs[0]["days_ago"] if runs else 0,
+        "runs": runs,
+    }
+
+def _header_row(d):
+    career = f"{d['wins']} - {d['places']} - {d['starts']}"
+    form = d["form"] if len(d["form"]) >= 3 else ""
+    dlw = "Mdn" if d["wins"] == 0 else d["dlr"] + 7
+    rtc = d["starts"] + 1 if d["starts"] else "FU"
+    return (f"{d['box']}. {form}{d['name'].title()} {d['sexage']} 0.0kg {d['box']} {d['trainer']} "
+            f"{career} ${d['prize']} {rtc} {d['dlr']} {dlw}")
+
+def _run_lines(run, track, meeting_date, trainer, rng):
+    date = meeting_date - datetime.timedelta(days=run["days_ago"])
+    fav = "F" if run["odds"] < 3 else ""
+    winner = f"{rng.choice(_NAME_A).title()} {rng.choice(_NAME_B).title()}"
+    race = " ".join(rng.choice(_RACE_WORDS, size=3))
+    return [
+        f"{_ordinal(run['pos'])} of {run['field']} {date.day}/{date:%m/%Y} {track} "
+        f"Margin {run['margin']:g} Lengths Distance {run['distance']}m SOT G RST GR {run['grade']} "
+        f"Race {race} Prize $1,790 API {rng.random() / 5:.2f}",
+        f"Race Time {_race_time(run['racetime'])} Sec Time {run['sectime']:.2f} BP {run['bp']} "
+        f"Odds {run['odds']:g}{fav} Trainer {trainer} Ongoing Winners 01-02-04 "
+        f"Track Direction Clockwise",
+        f"Winner {winner} ({rng.integers(1, 9)}) Settled {_ordinal(run['bp'])} 800m "
+        f"{_ordinal(run['pos'])} Turn {_ordinal(run['pos'])}",
+    ]
+
+def _section2_lines(d, track, meeting_date, rng):
+    w, p, s = d["wins"], d["places"], d["starts"]
+    win_pct = f"{100 * w // s if s else 0}%-{100 * (w + p) // s if s else 0}%"
+    record = f"{w}-{p}-{s} {win_pct}" if s else "First Ride"
+    lines = [
+        d["name"],
+        "j50s j350s t50s t350s",
+        f"{d['box']}. 0kg ({d['box']}) {d['colour']} {d['sexage'][:-1]} {d['sexage'][-1].upper()} "
+        f"{d['trainer'].upper()} Horse: {record}",
+        f"- - {rng.integers(1, 12)}-{rng.integers(12, 25)}-50 {rng.integers(20, 70)}-{rng.integers(70, 110)}-350",
+        f"{d['sire']} (AUS) - {d['dam']} (AUS) J/T:",
+        f"{rng.integers(2, 25)}%-{rng.integers(25, 50)}% {rng.integers(2, 25)}%-{rng.integers(25, 50)}%",
+        f"Raced Distance: {min(r['distance'] for r in d['runs']) if d['runs'] else 0}-"
+        f"{max(r['distance'] for r in d['runs']) if d['runs'] else 0} Winning Distance: NA",
+        f"Owner: {d['owner']}",
+        "CarPM/s 12mPM/s API RTC/km RDistTC DLS DLW DOD Car 12m Crs Dist ClockW AClockW",
+        f"${d['prize'] // max(s, 1)} ${d['prize'] // max(s, 1)} {rng.random():.1f} "
+        f"{s}/{rng.random() * 5:.3f} {s} {d['dlr']} 0 -4.3 {w}-{p}-{s} {w}-{p}-{s}",
+        "G1 G2 G3 LR FU 2U 3U Firm Good Soft Heavy AW Turf",
+        f"- - - - {w}-{p}-{s} - - - {w}-{p}-{s} - - {w}-{p}-{s} -",
+    ]
+    for run in d["runs"]:
+        lines.extend(_run_lines(run, track, meeting_date, d["trainer"], rng))
+    return lines
+
+def iter_card_lines(meetings=1, races=10, runners=8, history=5, seed=0, date=datetime.date(2025, 10, 19)):
+    """
+    Yield the lines of a synthetic card: `meetings` meetings of `races`
+    races with `runners` dogs each (names unique within a race), each dog
+    with up to `history` recent runs. Deterministic for a given seed.
+    """
+    rng = np.random.default_rng(seed)
+    for m in range(meetings):
+        track = TRACKS[m % len(TRACKS)]
+        for r in range(races):
+            distance = int(rng.choice(DISTANCES))
+            start = (17 * 60 + 57 + r * 20 + m % 7) % (12 * 60)
+            yield "Feature Form"
+            yield f"Race No {date.day} {date:%b %y} {start // 60 or 12:02d}:{start % 60:02d}PM {track} {distance}m"
+            yield f"{r + 1} {' '.join(rng.choice(_RACE_WORDS, size=3))}"
+            yield f"{GRADES[rng.integers(len(GRADES))][0]} Prizemoney: $1790 (AUD )"
+            yield "Tab FF Horse A/S WT BP Jockey (Claim) Trainer Career Prize RTC DLR DLW"
+            dogs = [_runner(rng, box, name, history, distance)
+                    for box, name in enumerate(_dog_names(rng, runners), start=1)]
+            for d in dogs:
+                yield _header_row(d)
+            for d in dogs:
+                yield from _section2_lines(d, track, date, rng)
+
+def generate_card(**kwargs):
+    """The whole synthetic card as one string (each line newline-terminated)."""
+    return "".join(line + "\n" for line in iter_card_lines(**kwargs))
+
+def meetings_for_runners(runners_total, races=10, runners=8):
+    """Meetings needed for at least runners_total dogs."""
+    return max(1, -(-runners_total // (races * runners)))
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Write a synthetic race card")
+    ap.add_argument("out", help="Output text file ('-' for stdout)")
+    ap.add_argument("--meetings", type=int, default=1)
+    ap.add_argument("--races", type=int, default=10, help="Races per meeting (default: 10)")
+    ap.add_argument("--runners", type=int, default=8, help="Dogs per race (default: 8)")
+    ap.add_argument("--history", type=int, default=5, help="Recent runs per dog at most (default: 5)")
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--date", type=datetime.date.fromisoformat, default=datetime.date(2025, 10, 19))
+    args = ap.parse_args(argv)
+
+    lines = iter_card_lines(args.meetings, args.races, args.runners, args.history, args.seed, args.date)
+    out = sys.stdout if args.out == "-" else open(args.out, "w", encoding="utf-8")
+    try:
+        for line in lines:
+            out.write(line + "\n")
+    finally:
+        if out is not sys.stdout:
+            out.close()
+    if out is not sys.stdout:
+        print(f"🐾 Wrote {args.meetings * args.races * args.runners} runners → {args.out}")
+
+if __name__ == "__main__":
+    main()
@@ -1,31 +1,5 @@
-import os
 import re
-import pdfplumber
-
-def extract_text_from_latest_pdf(folder):
-    if not os.path.exists(folder):
-        print(f"❌ Folder not found: {folder}")
-        return None
-
-    pdf_files = [f for f in os.listdir(folder) if f.lower().endswith(".pdf")]
-    if not pdf_files:
-        print("❌ No PDF files found.")
-        return None
-
-    pdf_files.sort(key=lambda f: os.path.getmtime(os.path.join(folder, f)), reverse=True)
-    pdf_path = os.path.join(folder, pdf_files[0])
-
-    text = ""
-    try:
-        with pdfplumber.open(pdf_path) as pdf:
-            for page in pdf.pages:
-                text += (page.extract_text() or "") + "\n"
-    except Exception as e:
-        print(f"⚠️ Error reading PDF: {e}")
-        return None
-
-    print(f"✅ Extracted text from {os.path.basename(pdf_path)}")
-    return text
+from src.extract import extract_text_from_latest_pdf
 
 def main():
     print("🔍 Running debug parser...")
@@ -1,75 +1,159 @@
+import argparse
 import pandas as pd
 import numpy as np
-import pdfplumber
 import os
-from src.parser import parse_race_form
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from src.extract import extract_text_from_pdf, iter_page_texts
+from src.parser import concat_race_cards, parse_race_card, parse_race_card_stream
 from src.features import compute_features  # ✅ Enhanced scoring logic
-
-def extract_text_from_pdf(pdf_path):
-    text = ""
-    with pdfplumber.open(pdf_path) as pdf:
-        for page in pdf.pages:
-            text += page.extract_text() + "\n"
-    return text
-
-# 🚀 Start pipeline
-print("🚀 Starting Greyhound Analytics")
-
-# ✅ Find all PDFs in data folder
-pdf_folder = "data"
-pdf_files = [f for f in os.listdir(pdf_folder) if f.lower().endswith(".pdf")]
-pdf_files.sort(key=lambda x: os.path.getmtime(os.path.join(pdf_folder, x)), reverse=True)
-
-if not pdf_files:
-    print("❌ No PDF files found in data folder.")
-    exit()
-
-all_dogs = []
-
-# ✅ Process each PDF
-for pdf_file in pdf_files:
-    pdf_path = os.path.join(pdf_folder, pdf_file)
+from src.instrument import INSTRUMENTS
+from src.output import write_outputs
+from src.history import HistoryStore
+from src.cache import file_sha256
+from src.profiling import PROFILE_MODES, profiled
+from src.probability import add_win_probabilities, exotics
+from src.simulate import simulate_races
+from src.config import EXOTIC_TOP_N, SIM_RUNS
+
+def process_pdf(pdf_path, page_workers=1, use_cache=True, history=True):
+    """
+    Extract, parse and score one PDF; returns (dogs, runs). Runs in a worker
+    process when --workers > 1. With history, trainer and box rates, par
+    times and regular trips come from the history store's indexes and bias
+    tables (as stored before this run).
+    """
     print(f"📄 Processing: {pdf_path}")
-    raw_text = extract_text_from_pdf(pdf_path)
-    df = parse_race_form(raw_text)
+    if use_cache:
+        raw_text = extract_text_from_pdf(pdf_path, workers=page_workers)
+        df, runs = parse_race_card(raw_text, use_cache=True)
+    else:
+        # Nothing to cache: parse race by race as pages come off the extractor
+        df, runs = parse_race_card_stream(iter_page_texts(pdf_path, workers=page_workers))
 
     # ✅ Convert DLR to numeric to avoid type errors
     df["DLR"] = pd.to_numeric(df["DLR"], errors="coerce")
 
     # ✅ Apply enhanced scoring
-    df = compute_features(df)
-    all_dogs.append(df)
-
-# ✅ Combine all dogs
-combined_df = pd.concat(all_dogs, ignore_index=True)
-print(f"🐾 Total dogs parsed: {len(combined_df)}")
-
-# ✅ Save full parsed form
-combined_df.to_csv("outputs/todays_form.csv", index=False)
-print("📄 Saved parsed form → outputs/todays_form.csv")
-
-# ✅ Save ranked dogs
-ranked = combined_df.sort_values(["Track", "RaceNumber", "FinalScore"], ascending=[True, True, False])
-ranked.to_csv("outputs/ranked.csv", index=False)
-print("📊 Saved ranked dogs → outputs/ranked.csv")
-
-# ✅ Save top picks across all tracks
-picks = ranked.groupby(["Track", "RaceNumber"]).head(1).reset_index(drop=True)
-picks = picks.sort_values("FinalScore", ascending=False)
-
-# Reorder columns
-priority_cols = ["Track", "RaceNumber", "Box", "DogName", "FinalScore", "PrizeMoney"]
-remaining_cols = [col for col in picks.columns if col not in priority_cols]
-ordered_cols = priority_cols + remaining_cols
-picks = picks[ordered_cols]
-
-picks.to_csv("outputs/picks.csv", index=False)
-print("🎯 Saved top picks → outputs/picks.csv")
-
-# ✅ Display top picks
-print("\n🏁 Top Picks Across All Tracks:")
-for _, row in picks.iterrows():
-    print(f"{row.Track} | Race {row.RaceNumber} | {row.DogName} | Score: {round(row.FinalScore, 3)}")
-
-print("\n📌 Press Enter to exit...")
-input()
+    if history:
+        store = HistoryStore()
+        return compute_features(df, runs=runs, history=store.index, bias=store.bias), runs
+    return compute_features(df, runs=runs), runs
+
+def _process_pdf_task(pdf_path, use_cache=True, history=True, instrument=False):
+    """Pool task: process_pdf plus this worker's instrumentation snapshot (or None)."""
+    if instrument:
+        INSTRUMENTS.reset()
+        INSTRUMENTS.enable()
+    result = process_pdf(pdf_path, use_cache=use_cache, history=history)
+    return result, INSTRUMENTS.snapshot() if instrument else None
+
+def parse_args(argv=None):
+    ap = argparse.ArgumentParser(description="Greyhound Analytics pipeline")
+    ap.add_argument("--workers", type=int, default=1,
+                    help="Number of processes for PDF extraction/parsing; a single PDF is split by page (default: 1, serial)")
+    ap.add_argument("--no-cache", dest="use_cache", action="store_false",
+                    help="Re-extract and re-parse every PDF instead of reading cached results")
+    ap.add_argument("--csv", action="store_true",
+                    help="Also write full CSV copies of the form and runs (Parquet, ranked.csv, picks.csv and exotics.csv are always written)")
+    ap.add_argument("--no-history", dest="history", action="store_false",
+                    help="Do not use or append to the history store (trainer/box rates fall back to constants)")
+    ap.add_argument("--sims", type=int, default=SIM_RUNS,
+                    help=f"Monte Carlo runnings per race for the picks' place/quinella/trifecta "
+                         f"frequencies (default: {SIM_RUNS:,}; 0 skips the simulation)")
+    ap.add_argument("--report", action="store_true",
+                    help="Time each stage and write outputs/run_report.json")
+    ap.add_argument("--profile", nargs="?", const="cprofile", choices=PROFILE_MODES,
+                    help="Profile the run with cProfile (default) or the stack sampler; writes "
+                         ".prof/.folded and a top-N summary to outputs/<date>/. With --workers, "
+                         "only the main process is profiled")
+    ap.add_argument("--profile-top", type=int, default=30,
+                    help="Functions listed in the profile summary (default: 30)")
+    ap.add_argument("--profile-pdf", metavar="PDF",
+                    help="Profile extracting, parsing and scoring this one PDF only (no outputs written)")
+    return ap.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+    INSTRUMENTS.enable(args.report)
+
+    if args.profile_pdf:
+        name = os.path.splitext(os.path.basename(args.profile_pdf))[0]
+        with profiled(name, mode=args.profile or "cprofile", top=args.profile_top):
+            process_pdf(args.profile_pdf, page_workers=args.workers, use_cache=args.use_cache, history=args.history)
+        return
+
+    if args.profile:
+        with profiled("main", mode=args.profile, top=args.profile_top):
+            run(args)
+    else:
+        run(args)
+
+    print("\n📌 Press Enter to exit...")
+    input()
+
+def run(args):
+    # 🚀 Start pipeline
+    print("🚀 Starting Greyhound Analytics")
+
+    # ✅ Find all PDFs in data folder
+    pdf_folder = "data"
+    pdf_files = [f for f in os.listdir(pdf_folder) if f.lower().endswith(".pdf")]
+    pdf_files.sort(key=lambda x: os.path.getmtime(os.path.join(pdf_folder, x)), reverse=True)
+
+    if not pdf_files:
+        print("❌ No PDF files found in data folder.")
+        exit()
+
+    pdf_paths = [os.path.join(pdf_folder, f) for f in pdf_files]
+
+    # ✅ Process each PDF (results stay in mtime order either way)
+    if args.workers > 1 and len(pdf_paths) == 1:
+        # A single large card: fan its pages out instead
+        all_dogs = [process_pdf(pdf_paths[0], page_workers=args.workers, use_cache=args.use_cache,
+                                history=args.history)]
+    elif args.workers > 1:
+        print(f"⚙️ Using {min(args.workers, len(pdf_paths))} worker processes")
+        task = partial(_process_pdf_task, use_cache=args.use_cache, history=args.history,
+                       instrument=args.report)
+        with ProcessPoolExecutor(max_workers=min(args.workers, len(pdf_paths))) as pool:
+            all_dogs = []
+            for result, snap in pool.map(task, pdf_paths):
+                INSTRUMENTS.merge(snap)
+                all_dogs.append(result)
+    else:
+        all_dogs = [process_pdf(p, use_cache=args.use_cache, history=args.history) for p in pdf_paths]
+
+    # ✅ Append each card to the dated history (cards already stored are skipped)
+    if args.history:
+        store = HistoryStore()
+        for path, (dogs, runs) in zip(pdf_paths, all_dogs):
+            n_dogs, n_runs = store.ingest(dogs, runs, batch=file_sha256(path)[:16])
+            print(f"🗄️ History: +{n_dogs} dogs, +{n_runs} runs from {os.path.basename(path)}")
+
+    # ✅ Combine all dogs (DogId renumbered across cards)
+    combined_df, combined_runs = concat_race_cards(all_dogs)
+    print(f"🐾 Total dogs parsed: {len(combined_df)}")
+
+    # ✅ Win probabilities per race and the most likely trifectas / first fours
+    combined_df = add_win_probabilities(combined_df)
+    exotic = exotics(combined_df, top=EXOTIC_TOP_N)
+    simulation = simulate_races(combined_df, n_sims=args.sims) if args.sims > 0 else None
+
+    # ✅ Save the typed form once; ranked and picks are small files derived from it
+    picks = write_outputs(combined_df, combined_runs, "outputs", csv=args.csv, exotics=exotic,
+                          simulation=simulation)
+
+    if args.report:
+        path = INSTRUMENTS.write_report("outputs/run_report.json", pdfs=pdf_files,
+                                        workers=args.workers, dogs=len(combined_df))
+        print(f"⏱️ Saved run report → {path}")
+
+    # ✅ Display top picks
+    print("\n🏁 Top Picks Across All Tracks:")
+    for _, row in picks.iterrows():
+        print(f"{row.Track} | Race {row.RaceNumber} | {row.DogName} | Score: {round(row.FinalScore, 3)} "
+              f"| Win: {row.WinProb:.0%}" + (f" | Place: {row.SimPlace:.0%}" if simulation is not None else ""))
+
+if __name__ == "__main__":
+    main()
@@ -1,22 +1,45 @@
+import argparse
 import subprocess
 import datetime
 import os
 
-def run_pipeline():
+def run_pipeline(profile=None, profile_pdf=None):
     today = datetime.date.today().strftime("%Y-%m-%d")
     print(f"\n📅 Running Greyhound Analytics for {today}...\n")
 
-    result = subprocess.run(["python", "main.py"], capture_output=True, text=True)
+    cmd = ["python", "main.py"]
+    if profile:
+        cmd += ["--profile", profile]
+    if profile_pdf:
+        cmd += ["--profile-pdf", profile_pdf]
+    # main.py waits for Enter before exiting
+    result = subprocess.run(cmd, capture_output=True, text=True, input="\n")
 
     print(result.stdout)
     if result.stderr:
         print("⚠️ Errors:\n", result.stderr)
 
-    for file in ["todays_form.csv", "ranked.csv", "picks.csv"]:
+    # A single-PDF profile writes no outputs
+    for file in [] if profile_pdf else ["ranked.csv", "picks.csv", "exotics.csv"]:
         path = os.path.join("outputs", file)
         if os.path.exists(path):
             print(f"✅ {file} generated.")
         else:
             print(f"❌ {file} missing.")
 
-if __name
\ No newline at end of file
+    if profile or profile_pdf:
+        profile_dir = os.path.join("outputs", today)
+        reports = [os.path.join(profile_dir, f) for f in os.listdir(profile_dir)
+                   if f.endswith("-top.txt")] if os.path.isdir(profile_dir) else []
+        if reports:
+            print(f"🔬 Profile summary → {max(reports, key=os.path.getmtime)}")
+        else:
+            print(f"❌ No profile written to {profile_dir}")
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Daily Greyhound Analytics run")
+    ap.add_argument("--profile", nargs="?", const="cprofile", choices=["cprofile", "sample"],
+                    help="Profile main.py (see main.py --help); files go to outputs/<date>/")
+    ap.add_argument("--profile-pdf", metavar="PDF", help="Profile a single PDF in isolation")
+    args = ap.parse_args()
+    run_pipeline(args.profile, args.profile_pdf)
@@ -0,0 +1,305 @@
+# src/backtest.py - Walk-forward backtests of weight profiles over the history store
+#
+#   python -m src.backtest [--start 2025-01-01] [--end 2025-12-31] [--window-days 30]
+#                          [--profiles default,...] [--workers 4] [--no-cache]
+#
+# A stored card's races are settled by the runs stored under later cards: a
+# runner's result is its run with the same DogName, date (RunDate ==
+# RaceDate) and Track (canonical_track on both sides); runners no later
+# card settles are reported as Unmatched. Stored runners keep the features
+# they were scored with, so replaying a profile is a gather of weight rows
+# and a dot product (all profiles at once), not a re-parse. Each window's runner table
+# (features + result) is cached under cache/backtest, keyed by the
+# partition files it was read from, and windows run in a process pool.
+import argparse
+import datetime
+import hashlib
+import os
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+
+import numpy as np
+import pandas as pd
+
+from src.cache import DiskCache, FRAME_SUFFIX, load_frame, store_frame
+from src.config import BACKTEST_CACHE_MAX_MB, HISTORY_DIR, WEIGHT_PROFILES, WIN_TEMPERATURE
+from src.features import FEATURE_COLUMNS, WeightRegistry, feature_matrix
+from src.history import HistoryStore
+from src.instrument import count, stage
+from src.parser import canonical_track
+from src.probability import win_probabilities
+
+BACKTEST_VERSION = 2  # bump when the cached window tables change shape
+BACKTEST_CACHE = DiskCache("backtest", BACKTEST_CACHE_MAX_MB * 1024 * 1024, suffix=FRAME_SUFFIX)
+
+RACE_KEYS = ["RaceDate", "Track", "RaceNumber"]
+TABLE_COLUMNS = RACE_KEYS + ["DogName", "Box", "Distance", "Grade"] + FEATURE_COLUMNS + ["OverexposedPenalty"]
+CALIBRATION_BINS = 10
+
+# Per-profile sums that windows add up; metrics() turns them into rates
+STAT_KEYS = ["races", "wins", "bets", "returns", "runners", "brier", "logloss", "unmatched"]
+
+def walk_forward_windows(start, end, test_days=30, train_days=0):
+    """
+    Consecutive test windows of test_days from start to end (inclusive; the
+    last one is clipped to end), each as (train_start, train_end,
+    test_start, test_end) with the train_days just before it (train_start
+    is None when train_days is 0).
+    """
+    start, end = pd.Timestamp(start).date(), pd.Timestamp(end).date()
+    windows = []
+    day = start
+    while day <= end:
+        stop = min(day + datetime.timedelta(days=test_days - 1), end)
+        train = (day - datetime.timedelta(days=train_days), day - datetime.timedelta(days=1)) if train_days else (None, None)
+        windows.append((*train, day, stop))
+        day = stop + datetime.timedelta(days=1)
+    return windows
+
+def _files(store, table, start, end):
+    return [os.path.join(p, f) for p in store.partitions(table, start, end)
+            for f in sorted(os.listdir(p)) if f.endswith(FRAME_SUFFIX)]
+
+def _cache_key(files, start, end):
+    h = hashlib.sha256(f"v{BACKTEST_VERSION}|{start}|{end}".encode())
+    for path in files:
+        st = os.stat(path)
+        h.update(f"|{path}:{st.st_size}:{st.st_mtime_ns}".encode())
+    return h.hexdigest()
+
+def _canonical_tracks(tracks):
+    """canonical_track per value (object dtype), resolved once per distinct name."""
+    tracks = tracks.astype(object)
+    return tracks.map({t: canonical_track(t) for t in tracks.dropna().unique()})
+
+def window_table(store, start, end, use_cache=True):
+    """
+    Runners of the cards raced from start to end (inclusive) with their
+    stored features and result (Position, Odds; NaN when no later card
+    lists the run), in race order.
+    """
+    files = _files(store, "dogs", start, end) + _files(store, "runs", start, end)
+    key = _cache_key(files, start, end)
+    if use_cache:
+        table = load_frame(BACKTEST_CACHE, key)
+        if table is not None:
+            count("backtest_cache.hit")
+            return table
+        count("backtest_cache.miss")
+
+    dogs = store.read("dogs", start, end)
+    if dogs.empty:
+        return pd.DataFrame(columns=TABLE_COLUMNS + ["Position", "Odds"])
+    missing = [c for c in FEATURE_COLUMNS if c not in dogs.columns]
+    if missing:
+        raise ValueError(f"Stored cards lack feature columns {missing}; re-run main.py on them to store scored form")
+    table = dogs[[c for c in TABLE_COLUMNS if c in dogs.columns]].copy()
+    table["Track"] = _canonical_tracks(table["Track"])
+
+    runs = store.read("runs", start, end, columns=["DogName", "RunDate", "Track", "Position", "Odds"])
+    if runs.empty:
+        table["Position"] = np.nan
+        table["Odds"] = np.nan
+    else:
+        runs = runs.rename(columns={"RunDate": "RaceDate"})
+        runs["Track"] = _canonical_tracks(runs["Track"])
+        runs = runs.drop_duplicates(["DogName", "RaceDate", "Track"])
+        table = table.merge(runs, on=["DogName", "RaceDate", "Track"], how="left")
+    table = table.sort_values(RACE_KEYS, kind="stable").reset_index(drop=True)
+    if use_cache:
+        store_frame(BACKTEST_CACHE, key, table)
+    return table
+
+def score_profiles(table, profiles):
+    """(n_runners, n_profiles) FinalScore of every runner under each profile (WEIGHT_PROFILES format)."""
+    registry = WeightRegistry(profiles)
+    scores = registry.score(feature_matrix(table), registry.row_codes(table))
+    return scores + table["OverexposedPenalty"].to_numpy(dtype=float, na_value=0.0)[:, None]
+
+def _race_slots(table):
+    """(race, slot) matrix of table rows (-1 for padding); table is in race order."""
+    groups = table.groupby(RACE_KEYS, sort=False, observed=True)
+    race = groups.ngroup().to_numpy()
+    slot = groups.cumcount().to_numpy()
+    rows = np.full((race.max(initial=-1) + 1, slot.max(initial=-1) + 1), -1, dtype=np.intp)
+    rows[race, slot] = np.arange(len(table))
+    return rows
+
+def window_stats(table, scores, temperature=WIN_TEMPERATURE, chunk=64):
+    """
+    Per-profile sums over the window's settled races (a winner is known):
+    races / wins / bets / returns for a 1-unit win bet on each race's top
+    scorer at its recorded odds (odds-to-1, so a win returns odds + 1), plus Brier score, log loss and calibration
+    bins of every runner's WinProb. unmatched counts the window's runners
+    without a result (the same for every profile). Profiles are evaluated chunk at a time
+    to bound the (race, slot, profile) arrays.
+    """
+    n_prof = scores.shape[1]
+    stats = {k: np.zeros(n_prof) for k in STAT_KEYS}
+    stats["bin_runners"] = np.zeros((n_prof, CALIBRATION_BINS))
+    stats["bin_prob"] = np.zeros((n_prof, CALIBRATION_BINS))
+    stats["bin_wins"] = np.zeros((n_prof, CALIBRATION_BINS))
+    if table.empty:
+        return stats
+
+    rows = _race_slots(table)
+    pos = table["Position"].to_numpy(dtype=float, na_value=np.nan)
+    unmatched = int(np.isnan(pos).sum())
+    stats["unmatched"] += unmatched
+    count("backtest.unmatched", unmatched)
+    won = np.where(rows >= 0, pos[rows] == 1, False)
+    settled = won.any(axis=1)
+    rows, won = rows[settled], won[settled]
+    pad = rows < 0
+    odds = np.where(pad, np.nan, table["Odds"].to_numpy(dtype=float, na_value=np.nan)[rows])
+    n_races, n_slots = rows.shape
+
+    for p0 in range(0, n_prof, chunk):
+        s = scores[:, p0:p0 + chunk][rows]  # (race, slot, profile)
+        s[pad] = np.nan
+        s = s.transpose(0, 2, 1)  # (race, profile, slot)
+        c = s.shape[1]
+        prob = win_probabilities(s.reshape(-1, n_slots), temperature).reshape(n_races, c, n_slots)
+        pick = np.where(np.isnan(s), -np.inf, s).argmax(axis=2)  # (race, profile)
+        r = np.arange(n_races)[:, None]
+        pick_won = won[r, pick]
+        pick_odds = odds[r, pick]
+        priced = ~(pick_won & np.isnan(pick_odds))  # a win without odds can't be settled as a bet
+        out = slice(p0, p0 + c)
+        stats["races"][out] += n_races
+        stats["wins"][out] += pick_won.sum(axis=0)
+        stats["bets"][out] += priced.sum(axis=0)
+        stats["returns"][out] += np.where(pick_won & priced, pick_odds + 1.0, 0.0).sum(axis=0)
+
+        valid = np.broadcast_to(~pad[:, None, :], prob.shape)
+        y = np.broadcast_to(won[:, None, :], prob.shape)
+        p = prob[valid]
+        hit = y[valid]
+        prof = np.broadcast_to(np.arange(c)[None, :, None], prob.shape)[valid]
+        stats["runners"][out] += np.bincount(prof, minlength=c)
+        stats["brier"][out] += np.bincount(prof, weights=(p - hit) ** 2, minlength=c)
+        clipped = np.clip(np.where(hit, p, 1 - p), 1e-12, 1.0)
+        stats["logloss"][out] += np.bincount(prof, weights=-np.log(clipped), minlength=c)
+        b = np.minimum((p * CALIBRATION_BINS).astype(np.intp), CALIBRATION_BINS - 1)
+        flat = prof * CALIBRATION_BINS + b
+        size = c * CALIBRATION_BINS
+        stats["bin_runners"][out] += np.bincount(flat, minlength=size).reshape(c, -1)
+        stats["bin_prob"][out] += np.bincount(flat, weights=p, minlength=size).reshape(c, -1)
+        stats["bin_wins"][out] += np.bincount(flat, weights=hit, minlength=size).reshape(c, -1)
+    return stats
+
+def metrics(stats, names):
+    """Summary rows (one per profile) from window_stats sums."""
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return pd.DataFrame({
+            "Profile": names,
+            "Races": stats["races"].astype(int),
+            "Wins": stats["wins"].astype(int),
+            "StrikeRate": stats["wins"] / stats["races"],
+            "Bets": stats["bets"].astype(int),
+            "ROI": (stats["returns"] - stats["bets"]) / stats["bets"],
+            "Brier": stats["brier"] / stats["runners"],
+            "LogLoss": stats["logloss"] / stats["runners"],
+            "Unmatched": stats["unmatched"].astype(int),
+        })
+
+def calibration(stats, names):
+    """Reliability table: mean WinProb vs observed win rate per probability bin and profile."""
+    with np.errstate(divide="ignore", invalid="ignore"):
+        n = stats["bin_runners"]
+        return pd.DataFrame({
+            "Profile": np.repeat(names, CALIBRATION_BINS),
+            "Bin": np.tile([f"{i / CALIBRATION_BINS:.1f}-{(i + 1) / CALIBRATION_BINS:.1f}"
+                            for i in range(CALIBRATION_BINS)], len(names)),
+            "Runners": n.ravel().astype(int),
+            "Predicted": (stats["bin_prob"] / n).ravel(),
+            "Observed": (stats["bin_wins"] / n).ravel(),
+        })
+
+def _window_task(window, root=HISTORY_DIR, profiles=None, temperature=WIN_TEMPERATURE, use_cache=True):
+    """Pool task: (window, stats) for one (test_start, test_end) window."""
+    start, end = window
+    store = HistoryStore(root)
+    table = window_table(store, start, end, use_cache=use_cache)
+    with stage("backtest_window", len(table)):
+        stats = window_stats(table, score_profiles(table, profiles), temperature)
+    return window, stats
+
+def history_dates(store):
+    """(first, last) race date of the stored cards, or (None, None) for an empty store."""
+    days = [os.path.basename(os.path.dirname(p)).split("=", 1)[1] for p in store.partitions("dogs")]
+    if not days:
+        return None, None
+    return datetime.date.fromisoformat(min(days)), datetime.date.fromisoformat(max(days))
+
+def backtest(profiles=None, start=None, end=None, window_days=30, workers=1,
+             temperature=WIN_TEMPERATURE, root=HISTORY_DIR, use_cache=True):
+    """
+    Replay the stored cards from start to end (default: everything stored)
+    under each profile (default: WEIGHT_PROFILES) in walk-forward windows of
+    window_days. Returns (summary, calibration): summary has one row per
+    (profile, window) plus "all" rows over the whole span.
+    """
+    profiles = profiles or WEIGHT_PROFILES
+    names = list(profiles)
+    first, last = history_dates(HistoryStore(root))
+    start, end = start or first, end or last
+    if start is None:
+        raise ValueError(f"No stored cards under {root}/ to backtest")
+    windows = [(s, e) for _, _, s, e in walk_forward_windows(start, end, window_days)]
+
+    task = partial(_window_task, root=root, profiles=profiles, temperature=temperature, use_cache=use_cache)
+    if workers > 1 and len(windows) > 1:
+        with ProcessPoolExecutor(max_workers=min(workers, len(windows))) as pool:
+            results = list(pool.map(task, windows))
+    else:
+        results = [task(w) for w in windows]
+
+    rows = []
+    total = None
+    for (s, e), stats in results:
+        m = metrics(stats, names)
+        m.insert(1, "Window", f"{s.isoformat()}..{e.isoformat()}")
+        rows.append(m)
+        total = stats if total is None else {k: total[k] + v for k, v in stats.items()}
+    overall = metrics(total, names)
+    overall.insert(1, "Window", "all")
+    summary = pd.concat(rows + [overall], ignore_index=True)
+    return summary, calibration(total, names)
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Backtest weight profiles over the history store")
+    ap.add_argument("--start", type=datetime.date.fromisoformat, help="First race date (default: earliest stored)")
+    ap.add_argument("--end", type=datetime.date.fromisoformat, help="Last race date (default: latest stored)")
+    ap.add_argument("--window-days", type=int, default=30, help="Walk-forward window length (default: 30)")
+    ap.add_argument("--profiles", help="Comma-separated WEIGHT_PROFILES names (default: all)")
+    ap.add_argument("--workers", type=int, default=1, help="Processes evaluating windows (default: 1)")
+    ap.add_argument("--temperature", type=float, default=WIN_TEMPERATURE,
+                    help=f"Softmax temperature for WinProb (default: {WIN_TEMPERATURE})")
+    ap.add_argument("--history", default=HISTORY_DIR, help=f"History store root (default: {HISTORY_DIR})")
+    ap.add_argument("--no-cache", dest="use_cache", action="store_false",
+                    help="Rebuild the window tables instead of reading cache/backtest")
+    ap.add_argument("--out", default="outputs", help="Directory for backtest.csv and calibration.csv")
+    args = ap.parse_args(argv)
+
+    profiles = WEIGHT_PROFILES
+    if args.profiles:
+        unknown = [p for p in args.profiles.split(",") if p not in WEIGHT_PROFILES]
+        if unknown:
+            ap.error(f"Unknown profiles: {', '.join(unknown)}")
+        profiles = {p: WEIGHT_PROFILES[p] for p in args.profiles.split(",")}
+
+    summary, calib = backtest(profiles, args.start, args.end, args.window_days, args.workers,
+                              args.temperature, args.history, args.use_cache)
+    os.makedirs(args.out, exist_ok=True)
+    summary.to_csv(os.path.join(args.out, "backtest.csv"), index=False)
+    calib.to_csv(os.path.join(args.out, "calibration.csv"), index=False)
+    overall = summary[summary["Window"] == "all"]
+    print(overall.to_string(index=False))
+    unmatched = int(overall["Unmatched"].iloc[0]) if len(overall) else 0
+    if unmatched:
+        print(f"⚠️ {unmatched} runners have no matched result (no later stored card lists the run)")
+    print(f"📈 Saved backtest → {os.path.join(args.out, 'backtest.csv')}, calibration.csv")
+
+if __name__ == "__main__":
+    main()
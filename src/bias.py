@@ -0,0 +1,142 @@
+# src/bias.py - Track/distance/box bias tables maintained from stored runs
+import os
+
+import numpy as np
+import pandas as pd
+
+from src.instrument import stage
+from src.parser import canonical_track
+
+MAX_BOX = 8
+
+# Race times are binned as seconds per 100m so one bin layout fits every trip
+PACE_MIN, PACE_MAX, PACE_STEP = 4.5, 8.0, 0.005
+PACE_BINS = int(round((PACE_MAX - PACE_MIN) / PACE_STEP))
+
+# Box win rates are shrunk toward 1 in 8 with this many pseudo-starts
+BOX_PRIOR = 1 / MAX_BOX
+BOX_PRIOR_STARTS = 20
+
+# A (track, distance) with at least this many timed runs counts as a regular trip there
+MIN_TRIP_RUNS = 20
+
+class BiasTables:
+    """
+    Per-(track, distance) arrays, one row per pair code: box starts/wins
+    (pair, box 0..8; 0 holds runs without a box) and a histogram of pace
+    (seconds per 100m) for median run times. add_runs() only adds the new
+    runs' counts, so updating costs O(new runs); lookups map each runner to
+    a pair code once and gather from the arrays.
+    """
+
+    def __init__(self, path=None):
+        self.path = path
+        self.pairs = []  # (track, distance) per code
+        self.box_starts = np.zeros((0, MAX_BOX + 1), dtype=np.int32)
+        self.box_wins = np.zeros((0, MAX_BOX + 1), dtype=np.int32)
+        self.pace_hist = np.zeros((0, PACE_BINS), dtype=np.int32)
+        if path and os.path.exists(path):
+            with np.load(path, allow_pickle=False) as z:
+                self.pairs = list(zip(z["tracks"].tolist(), z["distances"].tolist()))
+                self.box_starts = z["box_starts"]
+                self.box_wins = z["box_wins"]
+                self.pace_hist = z["pace_hist"]
+        self._codes = {p: i for i, p in enumerate(self.pairs)}
+        self._medians = None
+
+    def save(self, path=None):
+        path = path or self.path
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        tmp = f"{path}.{os.getpid()}.tmp.npz"
+        np.savez_compressed(
+            tmp,
+            tracks=np.array([t for t, _ in self.pairs], dtype=str),
+            distances=np.array([d for _, d in self.pairs], dtype=np.int32),
+            box_starts=self.box_starts, box_wins=self.box_wins, pace_hist=self.pace_hist,
+        )
+        os.replace(tmp, path)
+
+    def pair_codes(self, tracks, distances, add=False):
+        """
+        Pair code per (track, distance): -1 if unknown, unless add assigns it
+        a new code. Tracks go through canonical_track, so header and run-line
+        spellings of a track share its codes.
+        """
+        keys = pd.DataFrame({
+            "t": pd.Series(tracks).astype(object).to_numpy(),
+            "d": pd.to_numeric(pd.Series(distances), errors="coerce").to_numpy(dtype=float, na_value=np.nan),
+        })
+        # Resolve each distinct pair once (ngroup with sort=False numbers them by first appearance)
+        group = keys.groupby(["t", "d"], sort=False, dropna=False).ngroup().to_numpy()
+        codes = np.full(group.max(initial=-1) + 1, -1, dtype=np.int64)
+        for u, (t, d) in enumerate(keys.drop_duplicates().itertuples(index=False)):
+            if t is None or pd.isna(t) or pd.isna(d):
+                continue
+            pair = (canonical_track(str(t)), int(d))
+            code = self._codes.get(pair)
+            if code is None and add:
+                code = self._codes[pair] = len(self.pairs)
+                self.pairs.append(pair)
+            codes[u] = -1 if code is None else code
+        if add and len(self.pairs) > len(self.box_starts):
+            grow = len(self.pairs) - len(self.box_starts)
+            self.box_starts = np.vstack([self.box_starts, np.zeros((grow, MAX_BOX + 1), dtype=np.int32)])
+            self.box_wins = np.vstack([self.box_wins, np.zeros((grow, MAX_BOX + 1), dtype=np.int32)])
+            self.pace_hist = np.vstack([self.pace_hist, np.zeros((grow, PACE_BINS), dtype=np.int32)])
+        return codes[group]
+
+    def add_runs(self, runs):
+        """Fold stored runs (Track, Distance, BP, Position, RaceTimeSec) into the tables."""
+        if runs.empty:
+            return
+        with stage("bias_update", len(runs)):
+            pair = self.pair_codes(runs["Track"], runs["Distance"], add=True)
+            box = runs["BP"].to_numpy(dtype=float, na_value=np.nan)
+            box = np.where((box >= 1) & (box <= MAX_BOX), box, 0).astype(np.intp)
+            won = (runs["Position"].to_numpy(dtype=float, na_value=np.nan) == 1).astype(np.int32)
+            ok = pair >= 0
+            np.add.at(self.box_starts, (pair[ok], box[ok]), 1)
+            np.add.at(self.box_wins, (pair[ok], box[ok]), won[ok])
+
+            dist = runs["Distance"].to_numpy(dtype=float, na_value=np.nan)
+            with np.errstate(divide="ignore", invalid="ignore"):
+                pace = runs["RaceTimeSec"].to_numpy(dtype=float, na_value=np.nan) / dist * 100
+            b = np.floor((pace - PACE_MIN) / PACE_STEP)
+            timed = ok & np.isfinite(b) & (b >= 0) & (b < PACE_BINS)
+            np.add.at(self.pace_hist, (pair[timed], b[timed].astype(np.intp)), 1)
+            self._medians = None
+
+    def median_times(self):
+        """Median race time (s) per pair code from the pace histograms; NaN without timed runs."""
+        if self._medians is None:
+            cum = np.cumsum(self.pace_hist, axis=1)
+            total = cum[:, -1] if len(cum) else np.zeros(0)
+            mid = np.argmax(cum >= (total[:, None] + 1) // 2, axis=1) if len(cum) else np.zeros(0, dtype=np.intp)
+            pace = PACE_MIN + (mid + 0.5) * PACE_STEP
+            dist = np.array([d for _, d in self.pairs], dtype=float)
+            self._medians = np.where(total > 0, pace * dist / 100, np.nan)
+        return self._medians
+
+    def box_win_rate(self, pair, box):
+        """Shrunk win rate for each (pair code, box); BOX_PRIOR where the pair is unknown."""
+        box = np.asarray(pd.to_numeric(pd.Series(box), errors="coerce").to_numpy(dtype=float, na_value=np.nan))
+        box = np.where((box >= 1) & (box <= MAX_BOX), box, 0).astype(np.intp)
+        ok = pair >= 0
+        starts = np.zeros(len(pair))
+        wins = np.zeros(len(pair))
+        starts[ok] = self.box_starts[pair[ok], box[ok]]
+        wins[ok] = self.box_wins[pair[ok], box[ok]]
+        return (wins + BOX_PRIOR * BOX_PRIOR_STARTS) / (starts + BOX_PRIOR_STARTS)
+
+    def median_time(self, pair):
+        out = np.full(len(pair), np.nan)
+        ok = pair >= 0
+        out[ok] = self.median_times()[pair[ok]]
+        return out
+
+    def regular_trip(self, pair):
+        """True where the (track, distance) has at least MIN_TRIP_RUNS timed runs."""
+        out = np.zeros(len(pair), dtype=bool)
+        ok = pair >= 0
+        out[ok] = self.pace_hist[pair[ok]].sum(axis=1) >= MIN_TRIP_RUNS
+        return out
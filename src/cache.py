@@ -0,0 +1,123 @@
+# src/cache.py - Content-addressed on-disk caches
+import hashlib
+import os
+
+import pandas as pd
+
+from src.config import CACHE_DIR
+
+# ---------- Optional: Parquet via pyarrow. If unavailable, frames are pickled ----------
+try:
+    import pyarrow  # noqa: F401
+    _PARQUET_OK = True
+except Exception:
+    _PARQUET_OK = False
+
+FRAME_SUFFIX = ".parquet" if _PARQUET_OK else ".pkl"
+
+def file_sha256(path, chunk_size=1 << 20):
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+def text_sha256(text):
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+class DiskCache:
+    """
+    One file per key under CACHE_DIR/<name>, bounded to max_bytes.
+    A hit touches the file's mtime, and eviction removes the oldest
+    mtimes first, so the bound is least-recently-used.
+    """
+
+    def __init__(self, name, max_bytes, suffix=""):
+        self.dir = os.path.join(CACHE_DIR, name)
+        self.max_bytes = max_bytes
+        self.suffix = suffix
+
+    def path(self, key):
+        return os.path.join(self.dir, key + self.suffix)
+
+    def get_path(self, key):
+        """Path of a cached entry (marked as recently used), or None on a miss."""
+        path = self.path(key)
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            return None
+        return path
+
+    def get_bytes(self, key):
+        path = self.get_path(key)
+        if path is None:
+            return None
+        try:
+            with open(path, "rb") as f:
+                return f.read()
+        except FileNotFoundError:  # evicted by another process in between
+            return None
+
+    def put_bytes(self, key, data):
+        self.write(key, lambda tmp: _write_bytes(tmp, data))
+
+    def write(self, key, writer):
+        """Call writer(tmp_path) and atomically move the result into place."""
+        os.makedirs(self.dir, exist_ok=True)
+        path = self.path(key)
+        tmp = f"{path}.{os.getpid()}.tmp"
+        try:
+            writer(tmp)
+            os.replace(tmp, path)
+        finally:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+        self.evict()
+
+    def evict(self):
+        entries = []
+        for entry in os.scandir(self.dir):
+            if entry.is_file() and not entry.name.endswith(".tmp"):
+                st = entry.stat()
+                entries.append((st.st_mtime, st.st_size, entry.path))
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+
+def load_frame(cache, key):
+    """DataFrame stored under key, or None on a miss or unreadable entry."""
+    path = cache.get_path(key)
+    if path is None:
+        return None
+    try:
+        return _read_parquet(path) if path.endswith(".parquet") else pd.read_pickle(path)
+    except Exception:
+        return None
+
+def _read_parquet(path):
+    import pyarrow.parquet as pq
+    df = pd.read_parquet(path)
+    meta = pq.read_schema(path).pandas_metadata or {}
+    for col in meta.get("columns", []):
+        # Object columns of ints with gaps come back as float64; restore them
+        name = col.get("name")
+        if col.get("pandas_type") == "int64" and col.get("numpy_type") == "object" and name in df.columns:
+            df[name] = pd.Series([None if pd.isna(v) else int(v) for v in df[name]], index=df.index, dtype=object)
+    return df
+
+def store_frame(cache, key, df):
+    if cache.suffix == ".parquet":
+        cache.write(key, lambda tmp: df.to_parquet(tmp, index=False))
+    else:
+        cache.write(key, lambda tmp: df.to_pickle(tmp))
+
+def _write_bytes(path, data):
+    with open(path, "wb") as f:
+        f.write(data)
@@ -1,17 +1,82 @@
 # config.py
-SCORING_WEIGHTS = {
-    "win": 5,               # Points per career win
-    "place": 2,             # Points per career place (2nd/3rd)
-    "money": 0.0001,        # Points per $1 prize money (small because amounts are large)
-    "dlw_penalty": 0.05,    # Small penalty per day since last win
-    "rtc_boost": 0.5,       # Boost for RTC (if available)
-    "speed": 0.1,           # Points per km/h speed
-    "early_speed": 0.2,     # Points per early speed index
-    "form": 1,              # Multiplier for form score
-    "box_advantage": 2,     # Bonus for good box (1-4)
-    "box_disadvantage": 1,  # Penalty for bad box (7-8)
-    "trainer": 3,           # Bonus for successful trainer
-    
-    "win_threshold": 60,    # Minimum score for Win bet
-    "place_threshold": 45,  # Minimum score for Place bet
-}
\ No newline at end of file
+import json
+import os
+
+# On-disk caches (extracted PDF text, parsed forms)
+CACHE_DIR = "cache"
+TEXT_CACHE_MAX_MB = 256  # Least recently used entries are evicted beyond this
+PARSE_CACHE_MAX_MB = 256
+BACKTEST_CACHE_MAX_MB = 512  # Per-window runner tables (see src/backtest.py)
+
+# Append-only form history (see src/history.py)
+HISTORY_DIR = "history"
+
+# Feature weights used by compute_features. Each profile has weights per
+# distance band; optional "tracks" entries override single weights for a
+# band at that track, and "grades" entries override weights for runners
+# with that Grade (applied last). Grade is the race's class line in the
+# run-line spelling ("5", "4/5", "MDN"; see canonical_grade in
+# src/parser.py). Add profiles to score fields side by side.
+WEIGHT_PROFILES = {
+    "default": {
+        "bands": {
+            "sprint": {
+                "EarlySpeedIndex": 0.30,
+                "Speed_kmh": 0.20,
+                "ConsistencyIndex": 0.10,
+                "FinishConsistency": 0.05,
+                "PrizeMoney": 0.10,
+                "RecentFormBoost": 0.10,
+                "BoxBiasFactor": 0.10,
+                "TrainerStrikeRate": 0.05,
+                "DistanceSuit": 0.05,
+                "TrackConditionAdj": 0.05
+            },
+            "middle": {
+                "EarlySpeedIndex": 0.25,
+                "Speed_kmh": 0.20,
+                "ConsistencyIndex": 0.15,
+                "FinishConsistency": 0.05,
+                "PrizeMoney": 0.10,
+                "RecentFormBoost": 0.10,
+                "BoxBiasFactor": 0.05,
+                "TrainerStrikeRate": 0.05,
+                "DistanceSuit": 0.05,
+                "TrackConditionAdj": 0.05
+            },
+            "long": {
+                "EarlySpeedIndex": 0.20,
+                "Speed_kmh": 0.15,
+                "ConsistencyIndex": 0.20,
+                "FinishConsistency": 0.10,
+                "PrizeMoney": 0.10,
+                "RecentFormBoost": 0.10,
+                "BoxBiasFactor": 0.05,
+                "TrainerStrikeRate": 0.05,
+                "DistanceSuit": 0.05,
+                "TrackConditionAdj": 0.05
+            },
+        },
+        "tracks": {},   # e.g. {"Richmond": {"sprint": {"BoxBiasFactor": 0.15}}}
+        "grades": {},   # e.g. {"MDN": {"ConsistencyIndex": 0.05}}
+    },
+}
+# Profiles saved by `python -m src.optimize` (same layout), merged over the ones above
+TUNED_PROFILES_FILE = "weight_profiles.json"
+if os.path.exists(TUNED_PROFILES_FILE):
+    with open(TUNED_PROFILES_FILE, encoding="utf-8") as f:
+        WEIGHT_PROFILES.update(json.load(f))
+DEFAULT_WEIGHT_PROFILE = "default"
+
+# Finishing-order probabilities (see src/probability.py): win probabilities
+# are softmax(FinalScore / WIN_TEMPERATURE) within each race, so a lower
+# temperature concentrates them on the top scores. EXOTIC_TOP_N is the
+# number of most likely combinations per race and bet written to exotics.csv.
+WIN_TEMPERATURE = 5.0
+EXOTIC_TOP_N = 10
+
+# Monte Carlo race simulation (see src/simulate.py): runnings per race, the
+# RNG seed, and how many (race, simulation, dog) cells one batch may hold
+SIM_RUNS = 100_000
+SIM_SEED = 0
+SIM_CHUNK_CELLS = 4_000_000
@@ -1,7 +1,91 @@
 import os
+from concurrent.futures import ProcessPoolExecutor
 import pdfplumber
 
-def extract_text_from_latest_pdf(folder):
+from src.cache import DiskCache, file_sha256
+from src.config import TEXT_CACHE_MAX_MB
+from src.instrument import INSTRUMENTS, count, stage
+
+# Bump when extraction output changes so cached text is not reused
+EXTRACTOR_VERSION = 1
+
+TEXT_CACHE = DiskCache("text", TEXT_CACHE_MAX_MB * 1024 * 1024, suffix=".txt")
+
+# Pages handed to a worker per task when fanning one PDF out across processes
+PAGE_CHUNK = 8
+
+def _page_count(pdf_path):
+    with pdfplumber.open(pdf_path) as pdf:
+        return len(pdf.pages)
+
+def _extract_page_range(pdf_path, start, stop, instrument=False):
+    """
+    Worker task: text for pages [start, stop), flushing each page's cache
+    as it goes. Returns (texts, instrumentation snapshot or None).
+    """
+    if instrument:
+        INSTRUMENTS.reset()
+        INSTRUMENTS.enable()
+    texts = []
+    with pdfplumber.open(pdf_path, pages=list(range(start + 1, stop + 1))) as pdf:
+        for page in pdf.pages:
+            with stage("extract_page"):
+                texts.append(page.extract_text() or "")
+                page.flush_cache()
+    return texts, INSTRUMENTS.snapshot() if instrument else None
+
+def iter_page_texts(pdf_path, workers=1):
+    """
+    Yield the text of each page in order ("" for pages without text).
+    Page caches are released after every page so memory stays flat; with
+    workers > 1 the pages are split into chunks across a process pool and
+    only a few chunks are in flight at a time.
+    """
+    if workers <= 1:
+        with pdfplumber.open(pdf_path) as pdf:
+            for page in pdf.pages:
+                with stage("extract_page"):
+                    text = page.extract_text() or ""
+                    page.flush_cache()
+                yield text
+        return
+
+    n_pages = _page_count(pdf_path)
+    ranges = [(s, min(s + PAGE_CHUNK, n_pages)) for s in range(0, n_pages, PAGE_CHUNK)]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending = []
+        for start, stop in ranges:
+            pending.append(pool.submit(_extract_page_range, pdf_path, start, stop, INSTRUMENTS.enabled))
+            if len(pending) > workers:
+                yield from _chunk_texts(pending.pop(0))
+        for fut in pending:
+            yield from _chunk_texts(fut)
+
+def _chunk_texts(fut):
+    texts, snap = fut.result()
+    INSTRUMENTS.merge(snap)
+    return texts
+
+def extract_text_from_pdf(pdf_path, workers=1, use_cache=True):
+    """
+    Full document text, each page followed by a newline. Served from the
+    text cache (keyed by file SHA-256 and EXTRACTOR_VERSION) when possible.
+    """
+    key = None
+    if use_cache:
+        key = f"{file_sha256(pdf_path)}-x{EXTRACTOR_VERSION}"
+        cached = TEXT_CACHE.get_bytes(key)
+        if cached is not None:
+            count("text_cache.hit")
+            return cached.decode("utf-8")
+        count("text_cache.miss")
+
+    text = "".join(text + "\n" for text in iter_page_texts(pdf_path, workers=workers))
+    if key:
+        TEXT_CACHE.put_bytes(key, text.encode("utf-8"))
+    return text
+
+def extract_text_from_latest_pdf(folder, workers=1, use_cache=True):
     if not os.path.exists(folder):
         print(f"❌ Folder not found: {folder}")
         return None
@@ -15,13 +99,8 @@ def extract_text_from_latest_pdf(folder):
     pdf_files.sort(key=lambda f: os.path.getmtime(os.path.join(folder, f)), reverse=True)
     pdf_path = os.path.join(folder, pdf_files[0])
 
-    text = ""
     try:
-        with pdfplumber.open(pdf_path) as pdf:
-            for page in pdf.pages:
-                page_text = page.extract_text()
-                if page_text:
-                    text += page_text + "\n"
+        text = extract_text_from_pdf(pdf_path, workers=workers, use_cache=use_cache)
     except Exception as e:
         print(f"⚠️ Error reading PDF: {e}")
         return None
@@ -1,7 +1,235 @@
 import pandas as pd
 import numpy as np
 
-def compute_features(df):
+from src.config import DEFAULT_WEIGHT_PROFILE, WEIGHT_PROFILES
+from src.instrument import stage
+
+# Race-type adaptive weighting: one weight vector per distance band
+FEATURE_COLUMNS = [
+    "EarlySpeedIndex", "Speed_kmh", "ConsistencyIndex", "FinishConsistency",
+    "PrizeMoney", "RecentFormBoost", "BoxBiasFactor", "TrainerStrikeRate",
+    "DistanceSuit", "TrackConditionAdj",
+]
+
+DISTANCE_BANDS = ["sprint", "middle", "long"]
+
+# Sprint < 400m <= Middle <= 500m < Long; pd.cut bins are right-closed,
+# so the first edge sits just below 400 to keep 400m in the middle band.
+DISTANCE_BAND_EDGES = [-np.inf, np.nextafter(400, -np.inf), 500, np.inf]
+
+class WeightRegistry:
+    """
+    Weight profiles from config compiled into one dense array of shape
+    (profile, band, track, grade, feature). Track/grade slot 0 holds the
+    plain band weights used for anything without an override, so scoring a
+    runner is a gather of its weight row plus a dot product.
+    """
+
+    def __init__(self, profiles):
+        self.names = list(profiles)
+        self.tracks = sorted({t for p in profiles.values() for t in p.get("tracks", {})})
+        self.grades = sorted({g for p in profiles.values() for g in p.get("grades", {})})
+        self.weights = np.zeros((
+            len(self.names), len(DISTANCE_BANDS),
+            len(self.tracks) + 1, len(self.grades) + 1, len(FEATURE_COLUMNS),
+        ))
+        for pi, name in enumerate(self.names):
+            prof = profiles[name]
+            for bi, band in enumerate(DISTANCE_BANDS):
+                for ti, track in enumerate([None] + self.tracks):
+                    for gi, grade in enumerate([None] + self.grades):
+                        w = dict(prof["bands"][band])
+                        if track:
+                            w.update(prof.get("tracks", {}).get(track, {}).get(band, {}))
+                        if grade:
+                            w.update(prof.get("grades", {}).get(grade, {}))
+                        unknown = set(w) - set(FEATURE_COLUMNS)
+                        if unknown:
+                            raise ValueError(f"Weight profile '{name}' has unknown features: {sorted(unknown)}")
+                        self.weights[pi, bi, ti, gi] = [w.get(f, 0.0) for f in FEATURE_COLUMNS]
+        # Flattened (profile, band*track*grade, feature) view for gathers
+        self._rows = self.weights.reshape(len(self.names), -1, len(FEATURE_COLUMNS))
+
+    def row_codes(self, df):
+        """Flat (band, track, grade) weight-row index for each runner."""
+        bands = distance_band_codes(df["Distance"])
+        tracks = pd.Categorical(df["Track"], categories=self.tracks).codes.astype(np.intp) + 1 if "Track" in df.columns else 0
+        grades = pd.Categorical(df["Grade"], categories=self.grades).codes.astype(np.intp) + 1 if "Grade" in df.columns else 0
+        shape = self.weights.shape[1:4]
+        return np.ravel_multi_index(
+            (bands, np.broadcast_to(tracks, bands.shape), np.broadcast_to(grades, bands.shape)), shape
+        )
+
+    def score(self, X, rows, profiles=None):
+        """(n_dogs, n_profiles) weighted sums for the named profiles (all by default)."""
+        idx = [self.names.index(p) for p in (profiles or self.names)]
+        return np.einsum("nf,pnf->np", X, self._rows[idx][:, rows])
+
+WEIGHTS = WeightRegistry(WEIGHT_PROFILES)
+
+def distance_band_codes(distance):
+    """Band index (DISTANCE_BANDS order) for each distance; unknown distances score as long."""
+    codes = pd.cut(distance, bins=DISTANCE_BAND_EDGES, labels=False)
+    return np.nan_to_num(np.asarray(codes, dtype=float), nan=len(DISTANCE_BANDS) - 1).astype(np.intp)
+
+def feature_matrix(df):
+    """(n_dogs, n_features) float matrix in FEATURE_COLUMNS order; prize money in $1000s."""
+    X = df[FEATURE_COLUMNS].to_numpy(dtype=float, copy=True)
+    X[:, FEATURE_COLUMNS.index("PrizeMoney")] /= 1000
+    return X
+
+# Placeholder values for dogs whose field has no usable run history either
+_FALLBACK_BEST_TIME = 22.5
+_FALLBACK_SECTIONAL = 8.5
+
+# Sectionals are timed to a different point at every track/distance, so each
+# is taken relative to the median (par) sectional of the runs at its
+# track/distance, from pairs with at least this many timed runs.
+# EarlySpeedIndex puts a par sectional at _FALLBACK_SECTIONAL seconds.
+MIN_PAR_RUNS = 3
+
+def sectional_pars(runs):
+    """Median SecTimeSec per (Track, Distance) over runs, for pairs with MIN_PAR_RUNS+ timed runs."""
+    timed = pd.DataFrame({
+        "Track": runs["Track"].astype(object).to_numpy(),
+        "Distance": runs["Distance"].to_numpy(dtype=float, na_value=np.nan),
+        "SecTimeSec": runs["SecTimeSec"].to_numpy(dtype=float, na_value=np.nan),
+    }).dropna()
+    stats = timed.groupby(["Track", "Distance"])["SecTimeSec"].agg(["median", "size"])
+    return stats.loc[stats["size"] >= MIN_PAR_RUNS, "median"]
+
+def _par_lookup(pars, tracks, distances):
+    """Par sectional for each (track, distance); NaN where there is none."""
+    keys = pd.MultiIndex.from_arrays([
+        pd.Series(tracks).astype(object).to_numpy(),
+        pd.to_numeric(pd.Series(distances), errors="coerce").to_numpy(dtype=float, na_value=np.nan),
+    ])
+    return pars.reindex(keys).to_numpy(dtype=float)
+
+def recent_run_table(df, runs):
+    """
+    Line the runs table up with df's rows as contiguous per-dog segments.
+    Returns (table, offsets): table maps field -> float array over all runs
+    in df row order (most recent run first), and runs of row i are
+    table[...][offsets[i]:offsets[i+1]]. Margins are signed lengths behind
+    the winner (a win counts as negative, i.e. ahead). secrel is each
+    sectional over the par at its run's track/distance (sectional_pars).
+    """
+    runs = runs.sort_values(["DogId", "RunIdx"], kind="stable")
+    run_ids = runs["DogId"].to_numpy()
+    ids = df["DogId"].to_numpy() if "DogId" in df.columns else np.arange(len(df))
+    size = int(max(run_ids.max(initial=-1), ids.max(initial=-1))) + 1
+    counts_by_id = np.bincount(run_ids, minlength=size)
+    starts_by_id = np.concatenate([[0], np.cumsum(counts_by_id)[:-1]])
+
+    counts = counts_by_id[ids]
+    offsets = np.zeros(len(ids) + 1, dtype=np.intp)
+    np.cumsum(counts, out=offsets[1:])
+    # Row in `runs` for each slot of the df-ordered segments
+    take = np.repeat(starts_by_id[ids] - offsets[:-1], counts) + np.arange(offsets[-1])
+
+    pos = runs["Position"].to_numpy(dtype=float, na_value=np.nan)[take]
+    margin = runs["Margin"].to_numpy(dtype=float, na_value=np.nan)[take]
+    table = {
+        "pos": pos,
+        "distance": runs["Distance"].to_numpy(dtype=float, na_value=np.nan)[take],
+        "racetime": runs["RaceTimeSec"].to_numpy(dtype=float, na_value=np.nan)[take],
+        "sectime": runs["SecTimeSec"].to_numpy(dtype=float, na_value=np.nan)[take],
+        "secrel": (runs["SecTimeSec"].to_numpy(dtype=float, na_value=np.nan)
+                   / _par_lookup(sectional_pars(runs), runs["Track"], runs["Distance"]))[take],
+        "margin": np.where(pos == 1, -margin, margin),
+    }
+    return table, offsets
+
+_EMPTY_RUNS = pd.DataFrame({
+    "DogId": np.array([], dtype=np.int32), "RunIdx": np.array([], dtype=np.int16),
+    "Position": pd.array([], dtype="Int8"), "Track": pd.Series([], dtype=object),
+    "Distance": pd.array([], dtype="Int16"),
+    "Margin": np.array([]), "RaceTimeSec": np.array([]), "SecTimeSec": np.array([]),
+})
+
+def _segment_reduce(ufunc, values, offsets, empty=np.nan):
+    """ufunc.reduceat over each dog's run segment; dogs without runs get `empty`."""
+    counts = np.diff(offsets)
+    out = np.full(len(counts), empty, dtype=float)
+    has = counts > 0
+    if has.any():
+        out[has] = ufunc.reduceat(values, offsets[:-1][has])
+    return out
+
+def _first_k_valid(values, offsets, k):
+    """Mask and new offsets for the first k non-NaN values of every segment."""
+    valid = ~np.isnan(values)
+    csum = np.concatenate([[0], np.cumsum(valid)])
+    rank = csum[1:] - np.repeat(csum[offsets[:-1]], np.diff(offsets))
+    take = valid & (rank <= k)
+    new_offsets = np.concatenate([[0], np.cumsum(_segment_reduce(np.add, take.astype(float), offsets, 0.0))])
+    return take, new_offsets.astype(np.intp)
+
+def _segment_lists(values, offsets):
+    return [values[a:b].tolist() for a, b in zip(offsets[:-1], offsets[1:])]
+
+def run_history_features(df, runs, k=3):
+    """
+    Time/sectional/margin features from the runs table, computed with
+    segmented reductions over contiguous per-dog run segments rather than
+    per-dog Python.
+    Race times are scaled to today's distance: BestTimeSec is the fastest,
+    Last3TimesSec the last k (their spread is FinishConsistency). Sectionals
+    are compared through their track/distance par: SectionalRatio is the
+    best sectional over its par (below 1 is quicker than par) and
+    SectionalSec that ratio times today's par (NaN without one). Margins
+    holds the last k margins.
+    """
+    table, offsets = recent_run_table(df, runs)
+    counts = np.diff(offsets)
+    distance = np.repeat(df["Distance"].to_numpy(dtype=float), counts)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        scaled = table["racetime"] * distance / table["distance"]
+    scaled[~np.isfinite(scaled)] = np.nan
+
+    out = pd.DataFrame(index=df.index)
+    out["BestTimeSec"] = _segment_reduce(np.fmin, scaled, offsets)
+    out["SectionalRatio"] = _segment_reduce(np.fmin, table["secrel"], offsets)
+    today = _par_lookup(sectional_pars(runs), df["Track"], df["Distance"])
+    out["SectionalSec"] = out["SectionalRatio"].to_numpy() * today
+
+    take, t_off = _first_k_valid(scaled, offsets, k)
+    times = scaled[take]
+    t_cnt = np.diff(t_off)
+    mean = _segment_reduce(np.add, times, t_off) / np.where(t_cnt > 0, t_cnt, 1)
+    sq = (times - np.repeat(mean, t_cnt)) ** 2
+    out["FinishConsistency"] = np.sqrt(_segment_reduce(np.add, sq, t_off, 0.0) / np.where(t_cnt > 0, t_cnt, 1))
+    out["Last3TimesSec"] = _segment_lists(times, t_off)
+
+    take, m_off = _first_k_valid(table["margin"], offsets, k)
+    margins = table["margin"][take]
+    m_cnt = np.diff(m_off)
+    out["MarginAvg"] = _segment_reduce(np.add, margins, m_off) / np.where(m_cnt > 0, m_cnt, np.nan)
+    # mean(np.diff(m)) telescopes to (last - first) / (k - 1)
+    has = m_cnt >= 2
+    momentum = np.zeros(len(m_cnt))
+    momentum[has] = (margins[m_off[1:][has] - 1] - margins[m_off[:-1][has]]) / (m_cnt[has] - 1)
+    out["FormMomentum"] = momentum
+    out["Margins"] = _segment_lists(margins, m_off)
+    return out
+
+def compute_features(df, profiles=None, runs=None, history=None, bias=None):
+    """
+    Add derived features and FinalScore (DEFAULT_WEIGHT_PROFILE). Run-history
+    features come from the parser's runs table (matched on DogId); without
+    it every dog takes the fallbacks. With a HistoryIndex (history), trainer
+    strike rates are looked up from stored runs instead of the constant
+    fallback; with BiasTables (bias), so are box win rates, the
+    track/distance par time (TrackConditionAdj) and which trips are regular
+    at a track (DistanceSuit). Passing profile names also adds a
+    FinalScore_<name> column per profile, all scored in the same pass, for
+    A/B comparison.
+    """
+    with stage("features", len(df)):
+        return _compute_features(df, profiles, runs, history, bias)
+
+def _compute_features(df, profiles, runs, history, bias):
     df = df.copy()
 
     # Ensure numeric types
@@ -9,142 +237,116 @@ def compute_features(df):
     df["CareerStarts"] = pd.to_numeric(df["CareerStarts"], errors="coerce")
     df["Distance"] = pd.to_numeric(df["Distance"], errors="coerce")
 
-    # Placeholder values — replace with parsed metrics later
-    df["BestTimeSec"] = 22.5
-    df["SectionalSec"] = 8.5
-    df["Last3TimesSec"] = [[22.65, 22.52, 22.77]] * len(df)
-    df["Margins"] = [[5.0, 6.3, 10.3]] * len(df)
-    df["BoxBiasFactor"] = 0.1
-    df["TrackConditionAdj"] = 1.0
+    # Run-history metrics from the runs table
+    hist = run_history_features(df, _EMPTY_RUNS if runs is None else runs)
+    for col in ["BestTimeSec", "SectionalSec", "SectionalRatio", "Last3TimesSec", "Margins",
+                "FinishConsistency", "MarginAvg", "FormMomentum"]:
+        df[col] = hist[col]
+
+    # Dogs without history take the median of runners at the same track/distance
+    for col, fallback in [("BestTimeSec", _FALLBACK_BEST_TIME), ("SectionalSec", _FALLBACK_SECTIONAL),
+                          ("SectionalRatio", 1.0)]:
+        keys = [c for c in ["Track", "Distance"] if c in df.columns]
+        field = df.groupby(keys, dropna=False)[col].transform("median") if keys else np.nan
+        df[col] = df[col].fillna(field).fillna(fallback)
+    df["FinishConsistency"] = df["FinishConsistency"].fillna(0.0)
+    df["MarginAvg"] = df["MarginAvg"].fillna(0.0)
+
+    # Track/distance/box tables: one pair code per runner, then array gathers
+    pair = bias.pair_codes(df["Track"], df["Distance"]) if bias is not None else None
+    if bias is not None:
+        df["BoxBiasFactor"] = bias.box_win_rate(pair, df["Box"])
+        # Par (median) time over the dog's best: above 1 when the dog beats par
+        par = bias.median_time(pair) / df["BestTimeSec"].to_numpy(dtype=float)
+        df["TrackConditionAdj"] = np.where(np.isfinite(par), par, 1.0)
+    else:
+        df["BoxBiasFactor"] = 0.1
+        df["TrackConditionAdj"] = 1.0
 
     # Derived metrics
     df["Speed_kmh"] = (df["Distance"] / df["BestTimeSec"]) * 3.6
-    df["EarlySpeedIndex"] = df["Distance"] / df["SectionalSec"]
-    df["FinishConsistency"] = df["Last3TimesSec"].apply(lambda x: np.std(x))
-    df["MarginAvg"] = df["Margins"].apply(lambda x: np.mean(x))
-    df["FormMomentum"] = df["Margins"].apply(lambda x: np.mean(np.diff(x)) if len(x) >= 2 else 0)
+    # Par sectional = _FALLBACK_SECTIONAL seconds, whatever the track times the sectional to
+    df["EarlySpeedIndex"] = df["Distance"] / (_FALLBACK_SECTIONAL * df["SectionalRatio"])
+
+    wins = df["CareerWins"].to_numpy(dtype=float)
+    starts = df["CareerStarts"].to_numpy(dtype=float)
+    dlr = df["DLR"].to_numpy(dtype=float)
 
     # Consistency Index
-    df["ConsistencyIndex"] = df.apply(
-        lambda row: row["CareerWins"] / row["CareerStarts"] if row["CareerStarts"] > 0 else 0,
-        axis=1
-    )
+    with np.errstate(divide="ignore", invalid="ignore"):
+        df["ConsistencyIndex"] = np.where(starts > 0, wins / starts, 0.0)
 
     # Recent Form Boost
-    df["RecentFormBoost"] = df.apply(
-        lambda row: 1.0 if row["DLR"] <= 5 and row["CareerWins"] > 0 else 0.5 if row["DLR"] <= 10 else 0,
-        axis=1
-    )
+    df["RecentFormBoost"] = np.select([(dlr <= 5) & (wins > 0), dlr <= 10], [1.0, 0.5], 0.0)
 
-    # Distance Suitability
-    df["DistanceSuit"] = df["Distance"].apply(lambda x: 1.0 if x in [515, 595] else 0.7)
+    # Distance Suitability: 515/595, or any trip run regularly at the track
+    suited = df["Distance"].isin([515, 595]).to_numpy()
+    if bias is not None:
+        suited = suited | bias.regular_trip(pair)
+    df["DistanceSuit"] = np.where(suited, 1.0, 0.7)
 
     # Fallbacks
-    df["TrainerStrikeRate"] = df.get("TrainerStrikeRate", pd.Series([0.15] * len(df)))
+    if history is not None:
+        df["TrainerStrikeRate"] = history.trainer_strike_rate(df["Trainer"])
+    else:
+        df["TrainerStrikeRate"] = df.get("TrainerStrikeRate", pd.Series([0.15] * len(df)))
     df["RestFactor"] = df.get("RestFactor", pd.Series([0.8] * len(df)))
 
     # Overexposure Penalty
-    df["OverexposedPenalty"] = df["CareerStarts"].apply(lambda x: -0.1 if x > 80 else 0)
-
-    # Race-type adaptive weighting
-    def get_weights(distance):
-        if distance < 400:  # Sprint
-            return {
-                "EarlySpeedIndex": 0.30,
-                "Speed_kmh": 0.20,
-                "ConsistencyIndex": 0.10,
-                "FinishConsistency": 0.05,
-                "PrizeMoney": 0.10,
-                "RecentFormBoost": 0.10,
-                "BoxBiasFactor": 0.10,
-                "TrainerStrikeRate": 0.05,
-                "DistanceSuit": 0.05,
-                "TrackConditionAdj": 0.05
-            }
-        elif distance <= 500:  # Middle
-            return {
-                "EarlySpeedIndex": 0.25,
-                "Speed_kmh": 0.20,
-                "ConsistencyIndex": 0.15,
-                "FinishConsistency": 0.05,
-                "PrizeMoney": 0.10,
-                "RecentFormBoost": 0.10,
-                "BoxBiasFactor": 0.05,
-                "TrainerStrikeRate": 0.05,
-                "DistanceSuit": 0.05,
-                "TrackConditionAdj": 0.05
-            }
-        else:  # Long
-            return {
-                "EarlySpeedIndex": 0.20,
-                "Speed_kmh": 0.15,
-                "ConsistencyIndex": 0.20,
-                "FinishConsistency": 0.10,
-                "PrizeMoney": 0.10,
-                "RecentFormBoost": 0.10,
-                "BoxBiasFactor": 0.05,
-                "TrainerStrikeRate": 0.05,
-                "DistanceSuit": 0.05,
-                "TrackConditionAdj": 0.05
-            }
-
-    # FinalScore calculation
-    final_scores = []
-    for _, row in df.iterrows():
-        w = get_weights(row["Distance"])
-        score = (
-            row["EarlySpeedIndex"] * w["EarlySpeedIndex"] +
-            row["Speed_kmh"] * w["Speed_kmh"] +
-            row["ConsistencyIndex"] * w["ConsistencyIndex"] +
-            row["FinishConsistency"] * w["FinishConsistency"] +
-            (row["PrizeMoney"] / 1000) * w["PrizeMoney"] +
-            row["RecentFormBoost"] * w["RecentFormBoost"] +
-            row["BoxBiasFactor"] * w["BoxBiasFactor"] +
-            row["TrainerStrikeRate"] * w["TrainerStrikeRate"] +
-            row["DistanceSuit"] * w["DistanceSuit"] +
-            row["TrackConditionAdj"] * w["TrackConditionAdj"] +
-            row["OverexposedPenalty"]
-        )
-        final_scores.append(score)
+    df["OverexposedPenalty"] = np.where(starts > 80, -0.1, 0.0)
 
-    df["FinalScore"] = final_scores
+    # FinalScore: gather each dog's weight row (band/track/grade) per profile
+    # and take the dot product with its feature row
+    names = [DEFAULT_WEIGHT_PROFILE] + [p for p in (profiles or []) if p != DEFAULT_WEIGHT_PROFILE]
+    scores = WEIGHTS.score(feature_matrix(df), WEIGHTS.row_codes(df), names)
+    scores += df["OverexposedPenalty"].to_numpy()[:, None]
+    df["FinalScore"] = scores[:, 0]
+    for name in profiles or []:
+        df[f"FinalScore_{name}"] = scores[:, names.index(name)]
     return df
 
+# Confidence tiers: (top score above, separation above) for Tier 1, 2 and 3
+TIER_RULES = [(42, 3), (40, 2), (38, 1.5)]
+BET_TIERS = ["Tier 1", "Tier 2"]
+
 def generate_trifecta_table(df):
-    trifecta_rows = []
-
-    for (track, race), group in df.groupby(["Track", "RaceNumber"]):
-        top3 = group.sort_values("FinalScore", ascending=False).head(3)
-        if len(top3) < 3:
-            continue
-
-        scores = top3["FinalScore"].values
-        separation_score = (scores[0] - scores[1]) + (scores[1] - scores[2])
-
-        # Confidence tiering
-        if scores[0] > 42 and separation_score > 3:
-            tier = "Tier 1"
-        elif scores[0] > 40 and separation_score > 2:
-            tier = "Tier 2"
-        elif scores[0] > 38 and separation_score > 1.5:
-            tier = "Tier 3"
-        else:
-            tier = "Tier 4"
-
-        trifecta_rows.append({
-            "Track": track,
-            "RaceNumber": race,
-            "Dog1": top3.iloc[0]["DogName"],
-            "Dog2": top3.iloc[1]["DogName"],
-            "Dog3": top3.iloc[2]["DogName"],
-            "Score1": scores[0],
-            "Score2": scores[1],
-            "Score3": scores[2],
-            "SeparationScore": round(separation_score, 3),
-            "ConfidenceTier": tier,
-            "BetFlag": "BET" if tier in ["Tier 1", "Tier 2"] else "NO BET"
-        })
-
-    trifecta_df = pd.DataFrame(trifecta_rows)
+    """
+    Top three dogs of every race with at least three runners, their scores,
+    SeparationScore (top score minus third), ConfidenceTier and BetFlag,
+    best separated races first. One sort over all races: the top three are
+    the first three rows of each race's block (dogs on equal scores in
+    card order).
+    """
+    keys = ["Track", "RaceNumber"]
+    ranked = df[keys + ["DogName", "FinalScore"]].dropna(subset=keys)
+    ranked = ranked.sort_values(keys + ["FinalScore"], ascending=[True, True, False], kind="stable")
+    pos = ranked.groupby(keys, sort=False, observed=True).cumcount().to_numpy()
+
+    # Row of each race's third dog; the first and second sit just above it
+    third = np.flatnonzero(pos == 2)
+    names = ranked["DogName"].to_numpy(dtype=object)
+    scores = ranked["FinalScore"].to_numpy(dtype=float)
+    s1, s2, s3 = scores[third - 2], scores[third - 1], scores[third]
+    separation = (s1 - s2) + (s2 - s3)
+
+    tier = np.select(
+        [(s1 > top) & (separation > sep) for top, sep in TIER_RULES],
+        [f"Tier {i}" for i in range(1, len(TIER_RULES) + 1)],
+        f"Tier {len(TIER_RULES) + 1}",
+    ).astype(object)
+
+    trifecta_df = pd.DataFrame({
+        "Track": ranked["Track"].to_numpy(dtype=object)[third],
+        "RaceNumber": ranked["RaceNumber"].to_numpy()[third],
+        "Dog1": names[third - 2],
+        "Dog2": names[third - 1],
+        "Dog3": names[third],
+        "Score1": s1,
+        "Score2": s2,
+        "Score3": s3,
+        "SeparationScore": np.round(separation, 3),
+        "ConfidenceTier": tier,
+        "BetFlag": np.where(np.isin(tier, BET_TIERS), "BET", "NO BET").astype(object),
+    })
     trifecta_df = trifecta_df.sort_values("SeparationScore", ascending=False)
     return trifecta_df
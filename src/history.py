@@ -0,0 +1,221 @@
+# src/history.py - Append-only form history partitioned by race date and track
+#
+#   history/dogs/race_date=2025-10-19/track=Richmond/part-<batch>.parquet
+#   history/runs/race_date=2025-10-12/track=Richmond/part-<batch>.parquet
+#
+# "dogs" holds each ingested card's runners (partitioned by RaceDate), "runs"
+# the recent runs listed under them (partitioned by the run's own RunDate),
+# keyed by normalized DogName since DogId is only unique within a card.
+# Ingesting only ever adds part files; a runner or run already stored in
+# its partition is not written again, and re-ingesting a batch is a no-op.
+# Runs that are written also go into the lookup indexes (history/index/,
+# see src/history_index.py) and the track/distance/box bias tables
+# (history/bias.npz, see src/bias.py).
+import datetime
+import os
+import re
+import shutil
+
+import pandas as pd
+
+from src.bias import BiasTables
+from src.cache import FRAME_SUFFIX
+from src.config import HISTORY_DIR
+from src.history_index import HistoryIndex
+from src.instrument import count, stage
+from src.output import write_frame
+
+TABLES = ("dogs", "runs")
+
+# A run is the same run if these match (it shows up under every later card of the dog)
+RUN_KEY = ["DogName", "RunDate", "Track", "Distance", "Position"]
+DOG_KEY = ["DogName", "RaceDate", "Track", "RaceNumber"]
+
+# Columns restored to categoricals when partitions are read back
+_CATEGORIES = {"dogs": ["Track", "Trainer"], "runs": ["Track", "Grade", "Trainer"]}
+
+def normalize_name(name):
+    """Dog name as stored: upper case, single spaces, no surrounding whitespace."""
+    return re.sub(r"\s+", " ", str(name)).strip().upper()
+
+def _slug(value):
+    """Partition directory value (anything outside [A-Za-z0-9-] becomes '_')."""
+    return re.sub(r"[^A-Za-z0-9\-]", "_", str(value)) or "_"
+
+def _as_date(value):
+    if value is None:
+        return None
+    return pd.Timestamp(value).date()
+
+class HistoryStore:
+    """
+    Hive-style partitions (table/race_date=…/track=…) of parsed cards.
+    Queries list only the partition directories inside the requested date
+    range (and tracks) and read just those files.
+    """
+
+    def __init__(self, root=HISTORY_DIR):
+        self.root = root
+        self._index = None
+        self._bias = None
+
+    @property
+    def index(self):
+        """The HistoryIndex over stored runs (memory-mapped on first use)."""
+        if self._index is None:
+            self._index = HistoryIndex(os.path.join(self.root, "index"))
+        return self._index
+
+    @property
+    def bias(self):
+        """The BiasTables over stored runs (loaded on first use)."""
+        if self._bias is None:
+            self._bias = BiasTables(os.path.join(self.root, "bias.npz"))
+        return self._bias
+
+    # ---------- ingest ----------
+
+    def ingest(self, dogs, runs, batch, race_date=None):
+        """
+        Append one card: dogs (parsed form with DogId) and runs (keyed by
+        DogId). batch names the part files (e.g. the card's text hash);
+        race_date fills a blank RaceDate (default: today). Returns the
+        number of (dogs, runs) rows written.
+        """
+        with stage("history_ingest", len(dogs)):
+            dogs = dogs.copy()
+            dogs["DogName"] = dogs["DogName"].map(normalize_name)
+            fallback = (race_date or datetime.date.today()).isoformat()
+            dates = dogs["RaceDate"].replace("", None) if "RaceDate" in dogs.columns else None
+            dogs["RaceDate"] = pd.to_datetime(dates.fillna(fallback) if dates is not None else fallback)
+
+            names = pd.Series(dogs["DogName"].to_numpy(), index=dogs["DogId"].to_numpy())
+            runs = runs.drop(columns=["RunIdx"]).copy()
+            runs.insert(0, "DogName", names.reindex(runs.pop("DogId").to_numpy()).to_numpy())
+            runs = runs[runs["RunDate"].notna() & runs["DogName"].notna()]
+            runs = runs.drop_duplicates(RUN_KEY)
+
+            new_dogs = self._append("dogs", dogs.drop(columns=["DogId"]), "RaceDate", batch, dedup_on=DOG_KEY)
+            new_runs = self._append("runs", runs, "RunDate", batch, dedup_on=RUN_KEY)
+            if new_runs:
+                written = pd.concat(new_runs, ignore_index=True)
+                self.index.add_runs(written)
+                self.bias.add_runs(written)
+                self.bias.save()
+        n_dogs, n_runs = sum(map(len, new_dogs)), sum(map(len, new_runs))
+        count("history.dogs_written", n_dogs)
+        count("history.runs_written", n_runs)
+        return n_dogs, n_runs
+
+    def rebuild_index(self):
+        """Index every stored run (and rebuild the bias tables) from scratch, e.g. after a format change."""
+        shutil.rmtree(os.path.join(self.root, "index"), ignore_errors=True)
+        self._index = None
+        bias_path = os.path.join(self.root, "bias.npz")
+        if os.path.exists(bias_path):
+            os.remove(bias_path)
+        self._bias = None
+        for pdir in self.partitions("runs"):
+            part = self.read_partition(pdir)
+            self.index.add_runs(part)
+            self.bias.add_runs(part)
+        self.bias.save()
+        return self.index
+
+    def _append(self, table, df, date_col, batch, dedup_on=None):
+        """Write df's rows into their partitions; returns the part frames actually written."""
+        written = []
+        tracks = df["Track"].astype(object).fillna("UNKNOWN")
+        for (day, track), part in df.groupby([df[date_col].dt.date, tracks], sort=True):
+            pdir = self._partition_dir(table, day, track)
+            path_base = os.path.join(pdir, f"part-{batch}")
+            if os.path.exists(path_base + FRAME_SUFFIX):
+                continue  # batch already ingested
+            if dedup_on:
+                part = self._new_rows(pdir, part, dedup_on)
+                if part.empty:
+                    continue
+            os.makedirs(pdir, exist_ok=True)
+            part = part.reset_index(drop=True)
+            write_frame(part, path_base)
+            written.append(part)
+        return written
+
+    def _new_rows(self, pdir, part, keys):
+        """Rows of part whose keys are not in the partition's existing files."""
+        if not os.path.isdir(pdir):
+            return part
+        old = [_read(os.path.join(pdir, f), keys) for f in sorted(os.listdir(pdir)) if f.endswith(FRAME_SUFFIX)]
+        if not old:
+            return part
+        seen = pd.MultiIndex.from_frame(pd.concat(old, ignore_index=True).astype(object))
+        mask = pd.MultiIndex.from_frame(part[keys].astype(object)).isin(seen)
+        return part[~mask]
+
+    # ---------- queries ----------
+
+    def _partition_dir(self, table, day, track):
+        return os.path.join(self.root, table, f"race_date={day.isoformat()}", f"track={_slug(track)}")
+
+    def partitions(self, table, start=None, end=None, tracks=None):
+        """Partition directories of table with start <= race_date <= end (inclusive), optionally for tracks."""
+        if table not in TABLES:
+            raise ValueError(f"Unknown history table '{table}' (expected one of {', '.join(TABLES)})")
+        base = os.path.join(self.root, table)
+        if not os.path.isdir(base):
+            return []
+        start, end = _as_date(start), _as_date(end)
+        wanted = {_slug(t) for t in tracks} if tracks is not None else None
+        out = []
+        for d in sorted(os.listdir(base)):
+            if not d.startswith("race_date="):
+                continue
+            day = datetime.date.fromisoformat(d.split("=", 1)[1])
+            if (start and day < start) or (end and day > end):
+                continue
+            for t in sorted(os.listdir(os.path.join(base, d))):
+                if wanted is None or t.split("=", 1)[1] in wanted:
+                    out.append(os.path.join(base, d, t))
+        return out
+
+    def read_partition(self, pdir, columns=None):
+        return pd.concat([_read(os.path.join(pdir, f), columns) for f in sorted(os.listdir(pdir))
+                          if f.endswith(FRAME_SUFFIX)], ignore_index=True)
+
+    def read(self, table, start=None, end=None, tracks=None, columns=None, dog_names=None):
+        """Rows of table from the matching partitions; dog_names filters on normalized DogName."""
+        files = [os.path.join(p, f) for p in self.partitions(table, start, end, tracks)
+                 for f in sorted(os.listdir(p)) if f.endswith(FRAME_SUFFIX)]
+        count("history.files_read", len(files))
+        names = {normalize_name(n) for n in dog_names} if dog_names is not None else None
+        frames = []
+        for path in files:
+            df = _read(path, columns)
+            if names is not None:
+                df = df[df["DogName"].isin(names)]
+            frames.append(df)
+        if not frames:
+            return pd.DataFrame(columns=columns or [])
+        df = pd.concat(frames, ignore_index=True)
+        for c in _CATEGORIES[table]:
+            if c in df.columns:
+                df[c] = df[c].astype("category")  # concat falls back to object when categories differ
+        return df
+
+    def last_runs(self, dog_names, n=5):
+        """Each dog's n latest runs via the index (Dog is the position in dog_names); no partitions are read."""
+        return self.index.last_runs([normalize_name(d) for d in dog_names], n)
+
+    def dog_runs(self, name, days=90, as_of=None):
+        """All stored runs of one dog in the `days` days up to as_of (default: today), newest first."""
+        end = _as_date(as_of) or datetime.date.today()
+        runs = self.read("runs", start=end - datetime.timedelta(days=days), end=end, dog_names=[name])
+        if runs.empty:
+            return runs
+        return runs.sort_values("RunDate", ascending=False, kind="stable").reset_index(drop=True)
+
+def _read(path, columns=None):
+    if FRAME_SUFFIX == ".parquet":
+        return pd.read_parquet(path, columns=columns)
+    df = pd.read_pickle(path)
+    return df[columns] if columns else df
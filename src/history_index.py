@@ -0,0 +1,276 @@
+# src/history_index.py - Memory-mapped lookup indexes over the history store
+#
+#   history/index/meta.json           committed row/key counts
+#   history/index/keys_<kind>.txt     dog / trainer / track names, one per code
+#   history/index/run_<col>.bin       append-only run log, one raw array per column
+#   history/index/dog_last.bin        latest log row per dog code (-1: none)
+#   history/index/trainer_counts.bin  (starts, wins) per trainer code
+#
+# The run log is chained per dog in RunDate order (run_prev points at the
+# dog's previous run by date, whatever order runs were ingested in), so a dog's last N runs are N pointer hops and a whole field is
+# walked at once with array gathers. Ingest only appends to the log (plus
+# relinking the few runs a backfilled older run is spliced behind) and
+# touches the counters of the trainers it sees: O(new runs). Per-(track,
+# distance, box) counts live in the bias tables (src/bias.py).
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+from src.instrument import stage
+
+# Run log columns (raw little-endian arrays)
+RUN_COLUMNS = {
+    "dog": "<i4", "trainer": "<i4", "track": "<i4", "distance": "<i2", "box": "<i1",
+    "pos": "<i1", "field": "<i1", "day": "<i4", "racetime": "<f4", "sectime": "<f4",
+    "margin": "<f4", "odds": "<f4", "prev": "<i8",
+}
+KEY_KINDS = ("dog", "trainer", "track")
+
+# Prior strike rate for trainers with little or no history (shrinkage toward it)
+TRAINER_PRIOR = 0.15
+TRAINER_PRIOR_STARTS = 10
+
+_EPOCH = np.datetime64("1970-01-01", "D")
+
+class HistoryIndex:
+    """
+    Secondary indexes over stored runs, keyed by normalized dog name and
+    trainer. Opening one memory-maps the arrays
+    read-only; add_runs() appends to them and publishes the new counts.
+    """
+
+    def __init__(self, root):
+        self.root = root
+        self._load()
+
+    def _path(self, name):
+        return os.path.join(self.root, name)
+
+    def _load(self):
+        try:
+            with open(self._path("meta.json"), encoding="utf-8") as f:
+                meta = json.load(f)
+        except FileNotFoundError:
+            meta = {"runs": 0, "keys": {k: 0 for k in KEY_KINDS}}
+        self.n_runs = meta["runs"]
+        self.keys = {}
+        self.codes = {}
+        for kind in KEY_KINDS:
+            n = meta["keys"][kind]
+            names = []
+            if n:
+                with open(self._path(f"keys_{kind}.txt"), encoding="utf-8") as f:
+                    names = f.read().split("\n")[:n]
+            self.keys[kind] = names
+            self.codes[kind] = {k: i for i, k in enumerate(names)}
+        self.log = {c: self._map(f"run_{c}.bin", dt, self.n_runs) for c, dt in RUN_COLUMNS.items()}
+        self.dog_last = self._map("dog_last.bin", "<i8", len(self.keys["dog"]))
+        self.counts = {"trainer": self._map("trainer_counts.bin", "<i4", len(self.keys["trainer"]) * 2).reshape(-1, 2)}
+
+    def _map(self, name, dtype, n):
+        """Read-only memmap of the first n items (an empty array when n == 0)."""
+        if n == 0:
+            return np.zeros(0, dtype=dtype)
+        return np.memmap(self._path(name), dtype=dtype, mode="r", shape=(n,))
+
+    # ---------- ingest ----------
+
+    def _encode(self, kind, values, new_keys):
+        """Codes for values, assigning (and recording in new_keys) codes for unseen keys."""
+        codes = self.codes[kind]
+        out = np.empty(len(values), dtype=np.int64)
+        for i, v in enumerate(values):
+            if v is None or (isinstance(v, float) and np.isnan(v)):
+                out[i] = -1
+                continue
+            code = codes.get(v)
+            if code is None:
+                code = codes[v] = len(codes)
+                self.keys[kind].append(v)
+                new_keys[kind].append(v)
+            out[i] = code
+        return out
+
+    def add_runs(self, runs):
+        """
+        Append stored runs (history "runs" rows: DogName, RunDate, Track,
+        Distance, BP, Position, …) and update the chains and trainer
+        counters. Each run is linked in by RunDate, so runs older than a
+        dog's indexed ones (a backfill) land in date order too. Rows must not
+        already be indexed (HistoryStore passes only the rows it wrote).
+        """
+        if runs.empty:
+            return
+        with stage("history_index", len(runs)):
+            runs = runs.sort_values("RunDate", kind="stable")
+            new_keys = {k: [] for k in KEY_KINDS}
+            dog = self._encode("dog", runs["DogName"].tolist(), new_keys)
+            trainer = self._encode("trainer", runs["Trainer"].astype(object).tolist()
+                                   if "Trainer" in runs.columns else [None] * len(runs), new_keys)
+            track = self._encode("track", runs["Track"].astype(object).tolist(), new_keys)
+            distance = runs["Distance"].to_numpy(dtype=float, na_value=np.nan)
+            box = runs["BP"].to_numpy(dtype=float, na_value=np.nan)
+            pos = runs["Position"].to_numpy(dtype=float, na_value=np.nan)
+
+            days = (runs["RunDate"].to_numpy(dtype="datetime64[D]") - _EPOCH).astype(np.int64)
+            prev, last, relink = self._link(dog, days)
+            columns = {
+                "dog": dog, "trainer": trainer, "track": track,
+                "distance": np.nan_to_num(distance, nan=0), "box": np.nan_to_num(box, nan=0),
+                "pos": np.nan_to_num(pos, nan=0),
+                "field": runs["FieldSize"].to_numpy(dtype=float, na_value=0) if "FieldSize" in runs.columns else 0,
+                "day": days,
+                "racetime": runs["RaceTimeSec"].to_numpy(dtype=float, na_value=np.nan),
+                "sectime": runs["SecTimeSec"].to_numpy(dtype=float, na_value=np.nan),
+                "margin": runs["Margin"].to_numpy(dtype=float, na_value=np.nan),
+                "odds": runs["Odds"].to_numpy(dtype=float, na_value=np.nan),
+                "prev": prev,
+            }
+
+            won = (pos == 1).astype(np.int64)
+            c = np.zeros((len(self.keys["trainer"]), 2), dtype=np.int64)
+            c[:len(self.counts["trainer"])] = self.counts["trainer"]
+            ok = trainer >= 0
+            np.add.at(c[:, 0], trainer[ok], 1)
+            np.add.at(c[:, 1], trainer[ok], won[ok])
+            counts = {"trainer": c}
+
+            self._commit(columns, last, counts, new_keys, len(runs), relink)
+
+    def _link(self, dog, days):
+        """
+        Chain pointers for new runs (dog codes, days; in date order): each
+        run goes behind the dog's latest run on or before its day. Returns
+        (prev per new run, dog_last, relink) with relink {existing row: new
+        prev} for indexed runs that now sit after a backfilled one. Runs in
+        date order only compare against the chain head.
+        """
+        n_old = self.n_runs
+        last = np.full(len(self.keys["dog"]), -1, dtype=np.int64)
+        last[:len(self.dog_last)] = self.dog_last
+        prev = np.empty(len(dog), dtype=np.int64)
+        relink = {}
+
+        def day_of(r):
+            return days[r - n_old] if r >= n_old else self.log["day"][r]
+
+        def prev_of(r):
+            if r >= n_old:
+                return prev[r - n_old]
+            return relink.get(r, self.log["prev"][r])
+
+        for i, d in enumerate(dog):
+            row = n_old + i
+            after, cur = -1, last[d]  # walk back past runs later than this one
+            while cur >= 0 and day_of(cur) > days[i]:
+                after, cur = cur, prev_of(cur)
+            prev[i] = cur
+            if after < 0:
+                last[d] = row
+            elif after >= n_old:
+                prev[after - n_old] = row
+            else:
+                relink[after] = row
+        return prev, last, relink
+
+    def _commit(self, columns, last, counts, new_keys, n_new, relink=None):
+        """
+        Append the log and keys, rewrite the small per-key arrays, publish
+        meta.json, then relink indexed runs behind backfilled ones (until
+        then the chains just skip the new runs).
+        """
+        os.makedirs(self.root, exist_ok=True)
+        self.log = self.dog_last = self.counts = None  # release the maps before writing the files
+        for c, dt in RUN_COLUMNS.items():
+            arr = np.broadcast_to(np.asarray(columns[c]), (n_new,)).astype(dt)
+            with open(self._path(f"run_{c}.bin"), "r+b" if os.path.exists(self._path(f"run_{c}.bin")) else "wb") as f:
+                f.seek(self.n_runs * arr.itemsize)  # drop anything past the last commit
+                f.write(arr.tobytes())
+                f.truncate()
+        for kind, names in new_keys.items():
+            if names:  # rewritten whole so lines past an interrupted commit never linger
+                path = self._path(f"keys_{kind}.txt")
+                with open(f"{path}.{os.getpid()}.tmp", "w", encoding="utf-8") as f:
+                    f.write("".join(n + "\n" for n in self.keys[kind]))
+                os.replace(f"{path}.{os.getpid()}.tmp", path)
+        _write_array(self._path("dog_last.bin"), last.astype("<i8"))
+        for kind, c in counts.items():
+            _write_array(self._path(f"{kind}_counts.bin"), c.astype("<i4").ravel())
+
+        meta = {"runs": self.n_runs + n_new, "keys": {k: len(v) for k, v in self.keys.items()}}
+        tmp = self._path(f"meta.json.{os.getpid()}.tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(meta, f)
+        os.replace(tmp, self._path("meta.json"))
+        if relink:
+            with open(self._path("run_prev.bin"), "r+b") as f:
+                for row, p in sorted(relink.items()):
+                    f.seek(row * 8)
+                    f.write(np.array([p], dtype="<i8").tobytes())
+        self._load()
+
+    # ---------- lookups ----------
+
+    def _lookup(self, kind, values):
+        codes = self.codes[kind]
+        return np.array([codes.get(v, -1) for v in values], dtype=np.int64)
+
+    def last_runs(self, dog_names, n=5):
+        """
+        Up to n most recent indexed runs per (normalized) dog name, as a
+        frame with the position of the dog in dog_names (Dog), RunIdx
+        (0 = latest), RunDate, Track, Distance, Box, Position, FieldSize,
+        RaceTimeSec, SecTimeSec, Margin and Odds. All dogs are walked
+        together, one hop per step.
+        """
+        codes = self._lookup("dog", dog_names)
+        cur = np.full(len(codes), -1, dtype=np.int64)
+        cur[codes >= 0] = self.dog_last[codes[codes >= 0]]
+        dogs, rows, idx = [np.zeros(0, dtype=np.int64)], [np.zeros(0, dtype=np.int64)], [np.zeros(0, dtype=np.int64)]
+        for step in range(n):
+            live = np.flatnonzero(cur >= 0)
+            if not len(live):
+                break
+            dogs.append(live)
+            rows.append(cur[live])
+            idx.append(np.full(len(live), step))
+            cur[live] = self.log["prev"][cur[live]]
+        dogs, rows, idx = np.concatenate(dogs), np.concatenate(rows), np.concatenate(idx)
+        track_names = np.array(self.keys["track"] + [None], dtype=object)
+        out = pd.DataFrame({
+            "Dog": dogs,
+            "RunIdx": idx.astype(np.int16),
+            "RunDate": _EPOCH + self.log["day"][rows].astype("timedelta64[D]"),
+            "Track": track_names[self.log["track"][rows]],
+            "Distance": self.log["distance"][rows],
+            "Box": self.log["box"][rows],
+            "Position": self.log["pos"][rows],
+            "FieldSize": self.log["field"][rows],
+            "RaceTimeSec": self.log["racetime"][rows],
+            "SecTimeSec": self.log["sectime"][rows],
+            "Margin": self.log["margin"][rows],
+            "Odds": self.log["odds"][rows],
+        })
+        return out.sort_values(["Dog", "RunIdx"], kind="stable").reset_index(drop=True)
+
+    def _rates(self, kind, codes, prior, prior_starts):
+        counts = self.counts[kind]
+        starts = np.zeros(len(codes))
+        wins = np.zeros(len(codes))
+        ok = codes >= 0
+        if ok.any():
+            starts[ok] = counts[codes[ok], 0]
+            wins[ok] = counts[codes[ok], 1]
+        return (wins + prior * prior_starts) / (starts + prior_starts)
+
+    def trainer_strike_rate(self, trainers):
+        """Win rate per trainer, shrunk toward TRAINER_PRIOR (exactly the prior without history)."""
+        codes = self._lookup("trainer", [str(t).strip() if pd.notna(t) else None for t in trainers])
+        return self._rates("trainer", codes, TRAINER_PRIOR, TRAINER_PRIOR_STARTS)
+
+def _write_array(path, arr):
+    tmp = f"{path}.{os.getpid()}.tmp"
+    arr.tofile(tmp)
+    os.replace(tmp, path)
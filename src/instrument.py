@@ -0,0 +1,136 @@
+# src/instrument.py - Per-stage timings and counters for a pipeline run
+import json
+import os
+import sys
+import time
+from contextlib import nullcontext
+
+# ---------- Optional: peak RSS via resource (POSIX) or psutil. If unavailable, it is reported as None ----------
+try:
+    import resource
+    _RESOURCE_OK = True
+except Exception:
+    _RESOURCE_OK = False
+
+try:
+    import psutil
+    _PSUTIL_OK = True
+except Exception:
+    _PSUTIL_OK = False
+
+_NULL = nullcontext()
+
+def peak_rss_mb():
+    """High-water resident set size of this process in MB, or None."""
+    if _RESOURCE_OK:
+        rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return rss / (1024 * 1024) if sys.platform == "darwin" else rss / 1024  # bytes on macOS, KB elsewhere
+    if _PSUTIL_OK:
+        mem = psutil.Process().memory_info()
+        return getattr(mem, "peak_wset", mem.rss) / (1024 * 1024)
+    return None
+
+class _Stage:
+    __slots__ = ("inst", "name", "n", "wall", "cpu", "child_wall", "child_cpu")
+
+    def __init__(self, inst, name, n):
+        self.inst = inst
+        self.name = name
+        self.n = n
+
+    def __enter__(self):
+        self.child_wall = self.child_cpu = 0.0
+        self.inst._open.append(self)
+        self.wall = time.perf_counter()
+        self.cpu = time.process_time()
+        return self
+
+    def __exit__(self, *exc):
+        wall = time.perf_counter() - self.wall
+        cpu = time.process_time() - self.cpu
+        open_ = self.inst._open
+        open_.pop()
+        if open_:
+            open_[-1].child_wall += wall
+            open_[-1].child_cpu += cpu
+        self.inst._add(self.name, self.n, wall, wall - self.child_wall, cpu, cpu - self.child_cpu, peak_rss_mb())
+        return False
+
+class Instruments:
+    """
+    Wall time, CPU time, call/item counts and peak RSS per named stage,
+    plus free-form counters. Disabled by default: stage() then hands back
+    a shared no-op context and count() returns at once, so call sites can
+    stay in hot loops. Nested stages also report self time (their own time
+    minus that of stages opened inside them).
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self.reset()
+
+    def enable(self, on=True):
+        self.enabled = on
+
+    def reset(self):
+        self.stages = {}
+        self.counters = {}
+        self._open = []
+        self._started = time.perf_counter()
+
+    def stage(self, name, n=1):
+        """Context manager timing one pass through stage `name` covering n items."""
+        if not self.enabled:
+            return _NULL
+        return _Stage(self, name, n)
+
+    def count(self, name, n=1):
+        if self.enabled:
+            self.counters[name] = self.counters.get(name, 0) + n
+
+    def _add(self, name, n, wall, self_wall, cpu, self_cpu, rss):
+        s = self.stages.get(name)
+        if s is None:
+            s = self.stages[name] = {"calls": 0, "items": 0, "wall_s": 0.0, "self_s": 0.0,
+                                     "cpu_s": 0.0, "self_cpu_s": 0.0, "peak_rss_mb": None}
+        s["calls"] += 1
+        s["items"] += n
+        s["wall_s"] += wall
+        s["self_s"] += self_wall
+        s["cpu_s"] += cpu
+        s["self_cpu_s"] += self_cpu
+        if rss is not None:
+            s["peak_rss_mb"] = max(s["peak_rss_mb"] or 0.0, rss)
+
+    def snapshot(self):
+        """Picklable copy of the stages and counters (e.g. to return from a worker process)."""
+        return {"stages": {k: dict(v) for k, v in self.stages.items()}, "counters": dict(self.counters)}
+
+    def merge(self, snap):
+        """Fold a snapshot from another process into this one."""
+        if not snap:
+            return
+        for name, s in snap["stages"].items():
+            self._add(name, 0, s["wall_s"], s["self_s"], s["cpu_s"], s["self_cpu_s"], s["peak_rss_mb"])
+            self.stages[name]["calls"] += s["calls"] - 1
+            self.stages[name]["items"] += s["items"]
+        for name, n in snap["counters"].items():
+            self.counters[name] = self.counters.get(name, 0) + n
+
+    def report(self, **meta):
+        return {
+            **meta,
+            "wall_s": time.perf_counter() - self._started,
+            "peak_rss_mb": peak_rss_mb(),
+            **self.snapshot(),
+        }
+
+    def write_report(self, path, **meta):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.report(**meta), f, indent=2)
+        return path
+
+INSTRUMENTS = Instruments()
+stage = INSTRUMENTS.stage
+count = INSTRUMENTS.count
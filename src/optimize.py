@@ -0,0 +1,213 @@
+# src/optimize.py - Tune per-band weight vectors against backtest objectives
+#
+#   python -m src.optimize [--start 2025-01-01] [--end 2025-12-31] [--test-days 30]
+#                          [--method random|coordinate] [--objective logloss|brier|roi|strike]
+#                          [--rounds 50] [--batch 256] [--workers 4] [--base default] [--name tuned]
+#
+# The searched vector is a profile's (band, feature) weights; the base
+# profile's track/grade overrides stay fixed. Overridden weights don't
+# depend on the candidate, so they fold into a per-runner constant and a
+# batch of candidates scores as one (runners x features) @ (features x
+# candidates) product per band. Batches are split across a process pool
+# whose workers each hold the training runners. The best profile is saved
+# to TUNED_PROFILES_FILE, which config.py merges into WEIGHT_PROFILES.
+import argparse
+import copy
+import datetime
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from src.backtest import backtest, history_dates, metrics, walk_forward_windows, window_stats, window_table
+from src.config import DEFAULT_WEIGHT_PROFILE, HISTORY_DIR, TUNED_PROFILES_FILE, WEIGHT_PROFILES, WIN_TEMPERATURE
+from src.features import DISTANCE_BANDS, FEATURE_COLUMNS, WeightRegistry, distance_band_codes, feature_matrix
+from src.history import HistoryStore
+from src.instrument import stage
+
+# Backtest summary column per objective and its sign (losses are minimized)
+OBJECTIVES = {"logloss": ("LogLoss", 1), "brier": ("Brier", 1), "roi": ("ROI", -1), "strike": ("StrikeRate", -1)}
+METHODS = ("random", "coordinate")
+
+class BandScorer:
+    """
+    Runners prepared for scoring candidate band weights: score(W) for W of
+    shape (candidates, band, feature) equals FinalScore under the base
+    profile with its band weights replaced by each candidate.
+    """
+
+    def __init__(self, table, base):
+        self.base = base
+        registry = WeightRegistry({"base": base})
+        rows = registry.row_codes(table)
+        # Same profile with every band weight unset: what remains are the overrides
+        probe = copy.deepcopy(base)
+        probe["bands"] = {band: {f: np.nan for f in FEATURE_COLUMNS} for band in DISTANCE_BANDS}
+        fixed = WeightRegistry({"probe": probe}).weights.reshape(-1, len(FEATURE_COLUMNS))[rows]
+        overridden = ~np.isnan(fixed)
+
+        X = feature_matrix(table)
+        self.X = np.where(overridden, 0.0, X)
+        self.const = np.where(overridden, X * np.nan_to_num(fixed), 0.0).sum(axis=1)
+        self.const += table["OverexposedPenalty"].to_numpy(dtype=float, na_value=0.0)
+        self.band = distance_band_codes(table["Distance"])
+        self.start = registry.weights[0, :, 0, 0, :].copy()  # (band, feature) of the base profile
+
+    def score(self, W):
+        """(n_runners, n_candidates) scores for candidate band weights W (candidates, band, feature)."""
+        out = np.empty((len(self.X), len(W)))
+        for b in range(len(DISTANCE_BANDS)):
+            idx = self.band == b
+            out[idx] = self.X[idx] @ W[:, b, :].T
+        return out + self.const[:, None]
+
+    def profile(self, w):
+        """The base profile with band weights w (band, feature), in WEIGHT_PROFILES layout."""
+        prof = copy.deepcopy(self.base)
+        prof["bands"] = {band: {f: round(float(v), 4) for f, v in zip(FEATURE_COLUMNS, row)}
+                         for band, row in zip(DISTANCE_BANDS, w)}
+        return prof
+
+# Per-process state for pool workers (set once by _init_worker)
+_WORKER = {}
+
+def _init_worker(table, base, objective, temperature):
+    _WORKER.update(table=table, scorer=BandScorer(table, base), objective=objective, temperature=temperature)
+
+def _evaluate(W):
+    """Objective loss of each candidate (lower is better; inf when nothing was settled)."""
+    column, sign = OBJECTIVES[_WORKER["objective"]]
+    with stage("optimize_batch", len(W)):
+        stats = window_stats(_WORKER["table"], _WORKER["scorer"].score(W), _WORKER["temperature"])
+    loss = sign * metrics(stats, list(range(len(W))))[column].to_numpy(dtype=float)
+    return np.where(np.isfinite(loss), loss, np.inf)
+
+def _candidates(method, rng, w, step, batch):
+    """Candidate band weights around w: Gaussian steps (random) or one weight up/down each (coordinate)."""
+    scale = np.abs(w).mean() or 0.1
+    if method == "random":
+        cand = w + rng.normal(0.0, step * scale, (batch,) + w.shape)
+    else:
+        moves = np.eye(w.size).reshape((-1,) + w.shape) * step * scale
+        cand = w + np.concatenate([moves, -moves])
+    return np.clip(cand, 0.0, None)  # weights stay non-negative
+
+def optimize(table, base, method="random", objective="logloss", rounds=50, batch=256, step=0.25,
+             seed=0, workers=1, temperature=WIN_TEMPERATURE):
+    """
+    Search band weights of the base profile on table (window_table rows).
+    Each round scores a batch of candidates around the best so far and
+    moves to the best of them if it improves the objective; otherwise the
+    step is halved. Returns (profile, loss, trace) with trace the best loss
+    after each round.
+    """
+    if method not in METHODS:
+        raise ValueError(f"Unknown method '{method}' (expected one of {', '.join(METHODS)})")
+    if objective not in OBJECTIVES:
+        raise ValueError(f"Unknown objective '{objective}' (expected one of {', '.join(OBJECTIVES)})")
+    rng = np.random.default_rng(seed)
+    init = (table, base, objective, temperature)
+    pool = ProcessPoolExecutor(workers, initializer=_init_worker, initargs=init) if workers > 1 else None
+    if pool is None:
+        _init_worker(*init)
+
+    def evaluate(W):
+        if pool is None:
+            return _evaluate(W)
+        return np.concatenate(list(pool.map(_evaluate, np.array_split(W, workers))))
+
+    try:
+        scorer = BandScorer(table, base)
+        best_w = scorer.start
+        best = evaluate(best_w[None])[0]
+        trace = []
+        for r in range(rounds):
+            cand = _candidates(method, rng, best_w, step, batch)
+            loss = evaluate(cand)
+            i = int(np.argmin(loss))
+            if loss[i] < best:
+                best, best_w = loss[i], cand[i]
+            else:
+                step /= 2
+            trace.append(best)
+            print(f"🔧 Round {r + 1}/{rounds}: {len(cand)} candidates, best {objective} "
+                  f"{OBJECTIVES[objective][1] * best:.5f} (step {step:.4f})")
+    finally:
+        if pool is not None:
+            pool.shutdown()
+    return scorer.profile(best_w), OBJECTIVES[objective][1] * best, trace
+
+def save_profile(name, profile, path=TUNED_PROFILES_FILE):
+    """Add (or replace) name in the tuned-profiles file config.py loads."""
+    profiles = {}
+    if os.path.exists(path):
+        with open(path, encoding="utf-8") as f:
+            profiles = json.load(f)
+    profiles[name] = profile
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(profiles, f, indent=2)
+    os.replace(tmp, path)
+    return path
+
+def training_table(root, start, end, window_days=30, use_cache=True):
+    """Runners from start to end, read through the same cached windows as src.backtest."""
+    store = HistoryStore(root)
+    tables = [window_table(store, s, e, use_cache) for _, _, s, e in walk_forward_windows(start, end, window_days)]
+    tables = [t for t in tables if not t.empty]
+    if not tables:
+        return pd.DataFrame()
+    return pd.concat(tables, ignore_index=True)
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Tune per-band feature weights against backtest objectives")
+    ap.add_argument("--start", type=datetime.date.fromisoformat, help="First race date (default: earliest stored)")
+    ap.add_argument("--end", type=datetime.date.fromisoformat, help="Last race date (default: latest stored)")
+    ap.add_argument("--test-days", type=int, default=30,
+                    help="Hold out the last N days for an out-of-sample backtest (default: 30; 0 for none)")
+    ap.add_argument("--method", choices=METHODS, default="random")
+    ap.add_argument("--objective", choices=list(OBJECTIVES), default="logloss")
+    ap.add_argument("--rounds", type=int, default=50)
+    ap.add_argument("--batch", type=int, default=256, help="Candidates per round for random search (default: 256)")
+    ap.add_argument("--step", type=float, default=0.25, help="Initial step, relative to the mean weight (default: 0.25)")
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--workers", type=int, default=1, help="Processes scoring candidates (default: 1)")
+    ap.add_argument("--base", default=DEFAULT_WEIGHT_PROFILE, help="Profile to start from (default: the default profile)")
+    ap.add_argument("--name", default="tuned", help="Name to save the best profile under (default: tuned)")
+    ap.add_argument("--history", default=HISTORY_DIR, help=f"History store root (default: {HISTORY_DIR})")
+    ap.add_argument("--no-cache", dest="use_cache", action="store_false",
+                    help="Rebuild the window tables instead of reading cache/backtest")
+    args = ap.parse_args(argv)
+    if args.base not in WEIGHT_PROFILES:
+        ap.error(f"Unknown base profile '{args.base}'")
+
+    first, last = history_dates(HistoryStore(args.history))
+    start, end = args.start or first, args.end or last
+    if start is None:
+        ap.error(f"No stored cards under {args.history}/")
+    train_end = end - datetime.timedelta(days=args.test_days)
+    if train_end < start:
+        ap.error("--test-days leaves no training days")
+
+    table = training_table(args.history, start, train_end, use_cache=args.use_cache)
+    if table.empty or not (table["Position"] == 1).any():
+        ap.error(f"No settled races from {start} to {train_end}; nothing to tune on")
+    print(f"📚 Training on {len(table)} runners, {start} to {train_end}")
+    base = WEIGHT_PROFILES[args.base]
+    profile, best, _ = optimize(table, base, args.method, args.objective, args.rounds, args.batch,
+                                args.step, args.seed, args.workers)
+    if not np.isfinite(best):
+        ap.error(f"No candidate has a finite {args.objective}; profile '{args.name}' not saved")
+    path = save_profile(args.name, profile)
+    print(f"💾 Saved profile '{args.name}' ({args.objective} {best:.5f}) → {path}")
+
+    if args.test_days:
+        summary, _ = backtest({args.base: base, args.name: profile}, train_end + datetime.timedelta(days=1), end,
+                              window_days=args.test_days, root=args.history, use_cache=args.use_cache)
+        print(f"\n📈 Held-out backtest, {train_end + datetime.timedelta(days=1)} to {end}:")
+        print(summary[summary["Window"] == "all"].to_string(index=False))
+
+if __name__ == "__main__":
+    main()
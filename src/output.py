@@ -0,0 +1,103 @@
+# src/output.py - Typed form/runs datasets plus small ranked and picks files
+import os
+
+import pandas as pd
+
+from src.cache import FRAME_SUFFIX
+from src.instrument import stage
+
+# Repeated strings stored once per value (dictionary-encoded in Parquet)
+CATEGORICAL_COLUMNS = ["Track", "Trainer", "Sire", "Dam", "Colour", "Sex", "RaceTime"]
+
+RANK_KEYS = ["Track", "RaceNumber", "FinalScore"]
+RANKED_COLUMNS = ["Track", "RaceNumber", "Rank", "Box", "DogName", "FinalScore", "WinProb", "DogId"]
+PICK_COLUMNS = ["Track", "RaceNumber", "Box", "DogName", "FinalScore", "WinProb",
+                "SimWin", "SimPlace", "SimQuinella", "SimTrifecta", "PrizeMoney"]
+
+def rank_form(df):
+    """Dogs sorted by Track, RaceNumber and FinalScore (best first) with a per-race Rank."""
+    ranked = df.sort_values(RANK_KEYS, ascending=[True, True, False], kind="stable").reset_index(drop=True)
+    ranked["Rank"] = ranked.groupby(["Track", "RaceNumber"], sort=False, dropna=False).cumcount().astype("int16") + 1
+    return ranked
+
+def typed_form(df):
+    """Form with string-like columns as categoricals (ready for Parquet/Feather)."""
+    df = df.copy()
+    for col in CATEGORICAL_COLUMNS:
+        if col in df.columns:
+            df[col] = df[col].astype("category")
+    return df
+
+def top_picks(ranked, simulation=None):
+    """
+    Best dog of each race, highest FinalScore first, with the pick columns
+    leading; simulation (per-race Sim* frequencies) is joined on when given.
+    """
+    picks = ranked[ranked["Rank"] == 1].sort_values("FinalScore", ascending=False, kind="stable")
+    if simulation is not None:
+        keys = ["Track", "RaceNumber"]
+        sim = simulation.astype({"Track": object})
+        picks = picks.astype({"Track": object}).merge(sim, on=keys, how="left").astype({"Track": "category"})
+    cols = [c for c in PICK_COLUMNS if c in picks.columns]
+    return picks[cols + [c for c in picks.columns if c not in cols and c != "Rank"]]
+
+def write_frame(df, path_base):
+    """Write df to path_base + FRAME_SUFFIX (Parquet, or a pickle without pyarrow); returns the path."""
+    path = path_base + FRAME_SUFFIX
+    tmp = f"{path}.{os.getpid()}.tmp"
+    if FRAME_SUFFIX == ".parquet":
+        df.to_parquet(tmp, index=False)
+    else:
+        df.to_pickle(tmp)
+    os.replace(tmp, path)
+    return path
+
+def read_frame(path_base):
+    path = path_base + FRAME_SUFFIX
+    return pd.read_parquet(path) if FRAME_SUFFIX == ".parquet" else pd.read_pickle(path)
+
+def load_form(out_dir="outputs"):
+    """(form, runs) as written by write_outputs, with dtypes preserved; form is in ranked order."""
+    return read_frame(os.path.join(out_dir, "todays_form")), read_frame(os.path.join(out_dir, "todays_runs"))
+
+def write_outputs(dogs, runs, out_dir="outputs", csv=False, exotics=None, simulation=None):
+    """
+    Write the scored form once as a typed dataset (todays_form, in ranked
+    order with Rank) next to the runs table (todays_runs), then the small
+    derived files: ranked.csv (key columns only), picks.csv (best dog per
+    race, with the simulated bet frequencies when simulation is given) and,
+    when given, exotics.csv (ranked trifecta/first-four combinations). Only
+    with csv is a full todays_form.csv / todays_runs.csv copy written as
+    well, for spreadsheets. Returns the picks frame.
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    ranked = typed_form(rank_form(dogs))
+
+    with stage("frame_write", len(ranked)):
+        path = write_frame(ranked, os.path.join(out_dir, "todays_form"))
+    print(f"📄 Saved parsed form → {path}")
+    with stage("frame_write", len(runs)):
+        path = write_frame(runs, os.path.join(out_dir, "todays_runs"))
+    print(f"📄 Saved recent runs → {path}")
+
+    if csv:
+        with stage("csv_write", len(ranked) + len(runs)):
+            ranked.to_csv(os.path.join(out_dir, "todays_form.csv"), index=False)
+            runs.to_csv(os.path.join(out_dir, "todays_runs.csv"), index=False)
+        print(f"📄 Saved CSV copies → {os.path.join(out_dir, 'todays_form.csv')}, todays_runs.csv")
+
+    with stage("csv_write", len(ranked)):
+        ranked[[c for c in RANKED_COLUMNS if c in ranked.columns]].to_csv(
+            os.path.join(out_dir, "ranked.csv"), index=False)
+    print(f"📊 Saved ranked dogs → {os.path.join(out_dir, 'ranked.csv')}")
+
+    picks = top_picks(ranked, simulation)
+    with stage("csv_write", len(picks)):
+        picks.to_csv(os.path.join(out_dir, "picks.csv"), index=False)
+    print(f"🎯 Saved top picks → {os.path.join(out_dir, 'picks.csv')}")
+
+    if exotics is not None:
+        with stage("csv_write", len(exotics)):
+            exotics.to_csv(os.path.join(out_dir, "exotics.csv"), index=False)
+        print(f"🎲 Saved exotic combinations → {os.path.join(out_dir, 'exotics.csv')}")
+    return picks
@@ -1,26 +1,35 @@
 # src/parser.py
 # Full replacement: header parser (kept compatible) + “no-miss” Section 2 extractor.
 # - Robust header parsing (compatible with your existing format; supports short track codes)
-# - Guarantees RaceNumber/Track/Distance columns
+# - Guarantees RaceNumber/Track/Distance/Grade columns (Grade from the race class line)
 # - Auto race numbering fallback
+# - Streams lines race by race (parse_race_card_stream); the string API wraps it
 # - Deep Section 2 enrichment:
 #     * normalization
-#     * multi-anchor + fuzzy block finding
+#     * single-pass block index, with multi-anchor + fuzzy block finding as fallback
 #     * exact regex rules
 #     * token scanning (word-by-word)
-#     * recent runs extractor (list-of-dicts)
+#     * recent runs extractor (typed runs table keyed by DogId)
 # - Safe to run even if some fields are missing
 
+import datetime
 import re
+import numpy as np
 import pandas as pd
 
+from src.cache import DiskCache, FRAME_SUFFIX, load_frame, store_frame, text_sha256
+from src.config import PARSE_CACHE_MAX_MB
+from src.instrument import count, stage
+
 # ---------- Optional: fuzzy matcher (rapidfuzz). If unavailable, fall back gracefully ----------
 try:
-    from rapidfuzz import fuzz
+    from rapidfuzz import fuzz, process
     _FUZZY_OK = True
 except Exception:
     _FUZZY_OK = False
 
+from difflib import SequenceMatcher
+
 
 # =========================================
 # ============ HEADER PARSER ==============
@@ -40,93 +49,196 @@ _TRACK_MAP = {
     "BALL": "Ballarat", "GEEL": "Geelong",
 }
 
-def _normalize_track(track_raw: str) -> str:
-    t = (track_raw or "").strip()
+def canonical_track(track_raw: str) -> str:
+    """
+    One spelling per track for header and run-line names alike: short codes
+    map through _TRACK_MAP, full names are title-cased ("ALBION PARK" and
+    "Albion Park" -> "Albion Park", "RICHG" -> "Richmond").
+    """
+    t = " ".join((track_raw or "").split())
     if not t:
         return "UNKNOWN"
     key = t.upper().split()[0][:5]
     return _TRACK_MAP.get(key, t.title())
 
 
-def parse_race_form(text: str) -> pd.DataFrame:
+# Race class line under a header ("5th Grade Prizemoney: $2310 (AUD )", "Maiden Prizemoney: …")
+_GRADE_RE = re.compile(r"^(?P<grade>[A-Za-z0-9/\- ]+?)\s+Prizemoney:", re.I)
+_GRADE_MAP = {"MAIDEN": "MDN"}
+
+def canonical_grade(grade_raw):
+    """
+    Race grade in the run-line ("GR") spelling, for header class lines and
+    run lines alike: "5th Grade" -> "5", "4th/5th Grade" -> "4/5",
+    "Maiden" -> "MDN". None when there is no grade.
+    """
+    if grade_raw is None or pd.isna(grade_raw):
+        return None
+    g = re.sub(r"\s*\bGrade\b\s*", " ", str(grade_raw), flags=re.I)
+    g = re.sub(r"(\d)(?:st|nd|rd|th)\b", r"\1", " ".join(g.split()), flags=re.I).upper()
+    return _GRADE_MAP.get(g, g) or None
+
+
+# Bump when parse_race_card output changes so cached frames are not reused
+PARSER_VERSION = 10
+
+PARSE_CACHE = DiskCache("parsed", PARSE_CACHE_MAX_MB * 1024 * 1024, suffix=FRAME_SUFFIX)
+
+def parse_race_form(text: str, use_cache: bool = False) -> pd.DataFrame:
+    """Dog table only; see parse_race_card for the recent-runs table."""
+    return parse_race_card(text, use_cache=use_cache)[0]
+
+def parse_race_card(text: str, use_cache: bool = False):
     """
     Phase 1: Parse header table block (your original flow, but tolerant).
-    Returns a DataFrame of dogs with race info (RaceNumber/Track/Distance…).
-    Then calls Section 2 enricher to add dog-level details.
+    Returns (dogs, runs): a DataFrame of dogs with race info
+    (RaceNumber/Track/Distance/Grade…) keyed by DogId, and the typed recent-runs
+    table from Section 2 with a DogId foreign key.
+    With use_cache, tables parsed earlier from the same text (and the same
+    PARSER_VERSION) are loaded from disk instead.
     """
-    lines = text.splitlines()
-    dogs = []
-    current_race = {}
-    race_number = 0
+    key = None
+    if use_cache:
+        key = f"{text_sha256(text)}-p{PARSER_VERSION}"
+        dogs = load_frame(PARSE_CACHE, f"{key}-dogs")
+        runs = load_frame(PARSE_CACHE, f"{key}-runs")
+        if dogs is not None and runs is not None:
+            count("parse_cache.hit")
+            print(f"✅ Loaded {len(dogs)} parsed dogs ({len(runs)} runs) from cache.")
+            return dogs, runs
+        count("parse_cache.miss")
+
+    df, runs = parse_race_card_stream(text.splitlines())
+
+    if key:
+        try:
+            store_frame(PARSE_CACHE, f"{key}-dogs", df)
+            store_frame(PARSE_CACHE, f"{key}-runs", runs)
+        except Exception as e:
+            print(f"⚠️ Could not cache parsed form: {e}")
+    return df, runs
+
+# Header pattern compatible with your existing repo; supports short codes and extra spaces.
+_HEADER_RE = re.compile(
+    r"Race No\s*(\d{1,2}).*?(\d{2}:\d{2}[AP]M)\s+([A-Za-z0-9 ]+?)\s+(\d{3})m",
+    re.I,
+)
+
+# Meeting date after "Race No" ("Race No 19 Oct 25 05:57PM …"); RaceDate stays "" without it
+_HEADER_DATE_RE = re.compile(r"Race No\s*(\d{1,2} [A-Za-z]{3} \d{2})\b", re.I)
 
-    # Header pattern compatible with your existing repo; supports short codes and extra spaces.
-    header_re = re.compile(
-        r"Race No\s*(\d{1,2}).*?(\d{2}:\d{2}[AP]M)\s+([A-Za-z0-9 ]+?)\s+(\d{3})m",
-        re.I,
-    )
+def _race_date(line: str) -> str:
+    m = _HEADER_DATE_RE.match(line)
+    if not m:
+        return ""
+    try:
+        return datetime.datetime.strptime(m.group(1).title(), "%d %b %y").date().isoformat()
+    except ValueError:
+        return ""
+
+# Dog row pattern (kept as in your repo for header table):
+_DOG_RE = re.compile(
+    r"""^(\d+)\.?\s*([0-9]{3,6})?([A-Za-z'’\- ]+)\s+(\d+[a-z])\s+([\d.]+)kg\s+(\d+)\s+([A-Za-z'’\- ]+)\s+(\d+)\s*-\s*(\d+)\s*-\s*(\d+)\s+\$([\d,]+)\s+(\S+)\s+(\S+)\s+(\S+)""",
+    re.I,
+)
 
-    # Dog row pattern (kept as in your repo for header table):
-    dog_re = re.compile(
-        r"""^(\d+)\.?\s*([0-9]{3,6})?([A-Za-z'’\- ]+)\s+(\d+[a-z])\s+([\d.]+)kg\s+(\d+)\s+([A-Za-z'’\- ]+)\s+(\d+)\s*-\s*(\d+)\s*-\s*(\d+)\s+\$([\d,]+)\s+(\S+)\s+(\S+)\s+(\S+)""",
-        re.I,
-    )
+def _iter_lines(pages):
+    """Lines of each page (or line) string in turn."""
+    for page in pages:
+        yield from page.splitlines()
+
+def parse_race_card_stream(pages, debug: bool = False):
+    """
+    Streaming parse_race_card (no cache): pages is any iterable of page or
+    line strings, e.g. src.extract.iter_page_texts(pdf_path). Lines are
+    held one race at a time; when the next race header arrives, the race's
+    dog rows are enriched from its own (normalized) Section 2 text and the
+    lines are dropped, so peak memory follows the largest race, not the card.
+    """
+    race_dfs, run_dogs, run_rows = [], [], []
+    stats = {"matched": 0, "missed": 0, "indexed": 0}
+    n_dogs = 0
+
+    for race_dogs, race_lines in _iter_races(_iter_lines(pages)):
+        with stage("enrich", len(race_dogs)):
+            rdf = _dogs_frame(race_dogs, first_id=n_dogs)
+            rdf, dogs_i, rows_i = _enrich_race(rdf, _norm("\n".join(race_lines) + "\n"), stats, debug)
+        race_dfs.append(rdf)
+        run_dogs.extend(dogs_i)
+        run_rows.extend(rows_i)
+        n_dogs += len(rdf)
+
+    if race_dfs:
+        df = pd.concat(race_dfs, ignore_index=True)
+    else:
+        df = _dogs_frame([], first_id=0)
+        for c in _SECTION2_COLS:
+            df[c] = None
+    _number_races(df)
+
+    _report_enrichment(stats, debug)
+    print(f"✅ Parsed {len(df)} dogs (with {(df.get('Owner').notna().sum() if 'Owner' in df.columns else 0)} enriched).")
+    return df, _runs_frame(run_dogs, run_rows)
+
+def _parse_headers(lines) -> pd.DataFrame:
+    """Header phase only: the dog table (with DogId) before Section 2 enrichment."""
+    dogs = [d for race_dogs, _ in _iter_races(lines) for d in race_dogs]
+    df = _dogs_frame(dogs, first_id=0)
+    _number_races(df)
+    return df
+
+def _iter_races(lines):
+    """
+    Group lines by race header. Yields (dog rows, raw lines) per race that
+    has dogs (dogs before the first header form their own group).
+    """
+    # Open for the whole scan; enrichment of each yielded race (and page
+    # extraction when lines are streamed) is timed as nested stages
+    with stage("header_parse"):
+        yield from _scan_races(lines)
+
+def _scan_races(lines):
+    race_lines, race_dogs = [], []
+    current_race = {}
+    race_number = 0
 
     for raw in lines:
         line = raw.strip()
         if not line:
+            race_lines.append(raw)
             continue
 
-        m_head = header_re.match(line)
+        m_head = _HEADER_RE.match(line)
         if m_head:
+            if race_dogs:
+                yield race_dogs, race_lines
+            race_lines, race_dogs = [raw], []
             race_number += 1
             _, time_str, track_raw, dist = m_head.groups()
             current_race = {
                 "RaceNumber": race_number,
-                "RaceDate": "",  # keep as-is (your pipeline may set this elsewhere)
+                "RaceDate": _race_date(line),  # ISO date, or "" if the header has none
                 "RaceTime": time_str,
-                "Track": _normalize_track(track_raw),
+                "Track": canonical_track(track_raw),
                 "Distance": int(dist),
+                "Grade": None,  # from the class line below the header
             }
             continue
 
-        m_dog = dog_re.match(line)
+        race_lines.append(raw)
+        if current_race and not race_dogs and current_race["Grade"] is None:
+            m_grade = _GRADE_RE.match(line)
+            if m_grade:
+                current_race["Grade"] = canonical_grade(m_grade.group("grade"))
+                continue
+        m_dog = _DOG_RE.match(line)
         if m_dog:
-            (
-                box, form_number, raw_name, sex_age, weight, draw, trainer,
-                wins, places, starts, prize, rtc, dlr, dlw
-            ) = m_dog.groups()
-
-            dog_name = (raw_name or "").strip()
-            # handle glued form numbers at start of name (your original logic)
-            if form_number and dog_name.startswith(form_number[-2:] or ""):
-                dog_name = dog_name[len(form_number[-2:]):].strip()
-
-            dogs.append({
-                "Box": int(box),
-                "DogName": dog_name.upper(),
-                "FormNumber": form_number or "",
-                "Trainer": (trainer or "").strip(),
-                "SexAge": sex_age,
-                "Weight": float(weight),
-                "Draw": int(draw),
-                "CareerWins": int(wins),
-                "CareerPlaces": int(places),
-                "CareerStarts": int(starts),
-                "PrizeMoney": float(prize.replace(",", "")),
-                "RTC": rtc,
-                "DLR": dlr,
-                "DLW": dlw,
-                **current_race
-            })
-            continue
-
-    df = pd.DataFrame(dogs)
-
-    # Safety: ensure critical columns exist
-    for col in ["RaceNumber", "Track", "Distance"]:
-        if col not in df.columns:
-            df[col] = None
+            count("header_dogs")
+            race_dogs.append(_dog_row(m_dog, current_race))
+    if race_dogs:
+        yield race_dogs, race_lines
 
+def _number_races(df: pd.DataFrame):
     # Auto race numbering if header was missed
     if len(df) and df["RaceNumber"].isna().any():
         current = 1
@@ -135,10 +247,45 @@ def parse_race_form(text: str) -> pd.DataFrame:
                 current += 1
             df.at[i, "RaceNumber"] = current
 
-    # Phase 2: Section 2 enrichment
-    df = _enrich_section2(df, text, debug=False)
+def _dog_row(m_dog, current_race):
+    (
+        box, form_number, raw_name, sex_age, weight, draw, trainer,
+        wins, places, starts, prize, rtc, dlr, dlw
+    ) = m_dog.groups()
+
+    dog_name = (raw_name or "").strip()
+    # handle glued form numbers at start of name (your original logic)
+    if form_number and dog_name.startswith(form_number[-2:] or ""):
+        dog_name = dog_name[len(form_number[-2:]):].strip()
+
+    return {
+        "Box": int(box),
+        "DogName": dog_name.upper(),
+        "FormNumber": form_number or "",
+        "Trainer": (trainer or "").strip(),
+        "SexAge": sex_age,
+        "Weight": float(weight),
+        "Draw": int(draw),
+        "CareerWins": int(wins),
+        "CareerPlaces": int(places),
+        "CareerStarts": int(starts),
+        "PrizeMoney": float(prize.replace(",", "")),
+        "RTC": rtc,
+        "DLR": dlr,
+        "DLW": dlw,
+        **current_race
+    }
 
-    print(f"✅ Parsed {len(df)} dogs (with {(df.get('Owner').notna().sum() if 'Owner' in df.columns else 0)} enriched).")
+def _dogs_frame(dogs, first_id):
+    df = pd.DataFrame(dogs)
+
+    # Safety: ensure critical columns exist
+    for col in ["RaceNumber", "Track", "Distance", "Grade"]:
+        if col not in df.columns:
+            df[col] = None
+
+    # Foreign key for the runs table
+    df["DogId"] = np.arange(first_id, first_id + len(df), dtype=np.int32)
     return df
 
 
@@ -162,6 +309,30 @@ def _norm(txt: str) -> str:
     t = t.replace(" Kg", " kg").replace("KG", "kg")
     return re.sub(r"\s+", " ", t)
 
+# Single-pass block index: Section 2 dog headings ("NAME j50s j350s t50s t350s")
+# and race headers both close the previous block.
+_BLOCK_BOUNDARY = re.compile(
+    r"(?<![\w'\-])(?P<name>[A-Z][A-Z0-9'\-]*(?: [A-Z][A-Z0-9'\-]*)*)\s+j50s\s+j350s\s+t50s\s+t350s\s+"
+    r"|Race No\s*\d{1,2}"
+)
+
+def _build_block_index(full_text: str):
+    """
+    Scan the normalized text once and map each dog heading name to the
+    (start, end) span of its block. First occurrence wins, like .search().
+    """
+    index = {}
+    open_name = None
+    open_start = 0
+    for m in _BLOCK_BOUNDARY.finditer(full_text):
+        if open_name is not None:
+            index.setdefault(open_name, (open_start, m.start()))
+        open_name = m.group("name")
+        open_start = m.end()
+    if open_name is not None:
+        index.setdefault(open_name, (open_start, len(full_text)))
+    return index
+
 # Multi-anchor + fuzzy block finding
 def _compile_block_patterns(name: str):
     esc = re.escape(name)
@@ -171,29 +342,87 @@ def _compile_block_patterns(name: str):
         re.compile(rf"{esc}(?:\s+\d+)?\s+.*?(?=(?:\n?\d+\.\s+[A-Z]|$))", re.I | re.S),
     ]
 
-def _find_block(full_text: str, name: str, all_names_upper):
+# Fuzzy name recovery: candidates are collected once per document and shared by all misses
+_CANDIDATE_RX = re.compile(r"[A-Z][A-Z0-9' \-]{2,}")
+_LEN_BAND = 4
+
+def _build_fuzzy_candidates(full_text: str):
+    """
+    Unique upper-case runs in the text, plus buckets keyed by
+    (first letter, length band) so most lookups only score names of a
+    similar initial and length.
+    """
+    uniq = sorted({c.strip() for c in _CANDIDATE_RX.findall(full_text)} - {""})
+    buckets = {}
+    for c in uniq:
+        buckets.setdefault((c[0], len(c) // _LEN_BAND), []).append(c)
+    return uniq, buckets
+
+def _partial_ratio(a: str, b: str) -> float:
+    """Pure-Python stand-in for fuzz.partial_ratio (best window of the longer string)."""
+    short, long_ = (a, b) if len(a) <= len(b) else (b, a)
+    if not short:
+        return 0.0
+    sm = SequenceMatcher(None, autojunk=False)
+    sm.set_seq2(short)
+    best = 0.0
+    for i in range(len(long_) - len(short) + 1):
+        sm.set_seq1(long_[i:i + len(short)])
+        if sm.quick_ratio() * 100 <= best:
+            continue
+        best = max(best, sm.ratio() * 100)
+        if best == 100:
+            break
+    return best
+
+def _extract_best(name: str, pool, cutoff: float = 80):
+    if not pool:
+        return None
+    if _FUZZY_OK:
+        hit = process.extractOne(name, pool, scorer=fuzz.partial_ratio, score_cutoff=cutoff)
+        return hit[0] if hit and hit[1] > cutoff else None
+    best = None
+    best_score = cutoff
+    for c in pool:
+        sc = _partial_ratio(name, c)
+        if sc > best_score:
+            best_score = sc
+            best = c
+    return best
+
+def _fuzzy_best(name: str, candidates):
+    """Best candidate scoring > 80; probes the matching buckets before the full set."""
+    uniq, buckets = candidates
+    n = len(name)
+    near = []
+    # Second letter too: header names can carry a glued form letter ("XFEDERAL ARLO")
+    for ch in dict.fromkeys(name[:2]):
+        for band in range((n * 3 // 4) // _LEN_BAND, (n * 5 // 4) // _LEN_BAND + 1):
+            near.extend(buckets.get((ch, band), ()))
+    return _extract_best(name, near) or _extract_best(name, uniq)
+
+def _find_block(full_text: str, name: str, all_names_upper, candidates=None, block_index=None):
     # Exact patterns
     for pat in _compile_block_patterns(name):
         m = pat.search(full_text)
         if m:
+            count("block_find.exact")
             return m.group(1)
 
-    # Fuzzy (if available)
-    if _FUZZY_OK:
-        candidates = re.findall(r"[A-Z][A-Z0-9' \-]{2,}", full_text)
-        best = None
-        best_score = 0
-        for c in set(candidates):
-            sc = fuzz.partial_ratio(name, c)
-            if sc > best_score:
-                best_score = sc
-                best = c
-        if best and best_score > 80:
-            esc = re.escape(best)
-            for pat in _compile_block_patterns(best):
-                m = pat.search(full_text)
-                if m:
-                    return m.group(1)
+    # Fuzzy (rapidfuzz if available, difflib otherwise)
+    if candidates is None:
+        candidates = _build_fuzzy_candidates(full_text)
+    best = _fuzzy_best(name, candidates)
+    if best:
+        span = (block_index or {}).get(best)
+        if span:
+            count("block_find.fuzzy")
+            return full_text[span[0]:span[1]]
+        for pat in _compile_block_patterns(best):
+            m = pat.search(full_text)
+            if m:
+                count("block_find.fuzzy")
+                return m.group(1)
 
     # Sliding window fallback
     i = full_text.find(name)
@@ -201,7 +430,9 @@ def _find_block(full_text: str, name: str, all_names_upper):
         window = full_text[i:i+4000]
         parts = re.split(r"\n?\d+\.\s+[A-Z]", window)
         if parts:
+            count("block_find.window")
             return parts[0]
+    count("block_find.miss")
     return None
 
 # Regex rules
@@ -230,8 +461,90 @@ _FIELD_RX = {
     "grade_3U": re.compile(r"\b3U\b\s+(\d+-\d+-\d+)", re.I),
 }
 
-# Token scanning for times/margins/prize/distances/track in block text
-def _scan_tokens(block: str):
+# Token rules for times/margins/prize/distances/track in block text; each
+# is the old word-by-word check (on block.split()) as one pattern, and the
+# last occurrence in a block wins
+_TRACK_WORDS = ("darwin","richmond","wentworth","albion","mandurah",
+                "gosford","sandown","cannington","dubbo","bathurst","grafton")
+_TOKEN_RX = {
+    # Distances like 401m
+    "distance": re.compile(r"(?<!\S)(\d{3})m(?!\S)"),
+    "prize": re.compile(r"(?<!\S)prize\s+(\$?\d[\d,]*(?:\.\d+)?)(?!\S)", re.I),
+    "margin": re.compile(r"(?<!\S)margin\s+([\d.]+)(?!\S)", re.I),
+    "racetime": re.compile(r"(?<!\S)race\s+time\s+(\d+:\d{2}\.\d{2})(?!\S)", re.I),
+    "sectime": re.compile(r"(?<!\S)sec\s+time\s+(\d{1,2}\.\d{2})(?!\S)", re.I),
+    # Track name presence in results lines
+    "track": re.compile(r"(?<!\S)(" + "|".join(_TRACK_WORDS) + r")(?!\S)", re.I),
+}
+
+_RUN_START = re.compile(r"\d{1,2}(?:st|nd|rd|th)\s+of\s+\d+")
+
+# Single-pass keyword scan. Every _FIELD_RX (except sire_dam), _TOKEN_RX and
+# run-start match begins with one of these keywords (lower-cased), so one
+# scan over the block gives, in order, every position worth trying; the exact
+# pattern is then only matched there. Digit runs are kept only when followed
+# by what a run start, "401m" or "0kg" needs.
+_KEYWORD_HANDLERS = {
+    "api": ("api",), "carpm/s": ("carpm",), "12mpm/s": ("pm12",), "rtc/km": ("rtc_km",),
+    "rdisttc": ("rdisttc",), "dls": ("dls",), "dlw": ("dlw",), "dod": ("dod",),
+    "g1": ("grade_G1",), "g2": ("grade_G2",), "g3": ("grade_G3",), "lr": ("grade_LR",),
+    "fu": ("grade_FU",), "2u": ("grade_2U",), "3u": ("grade_3U",),
+    "raced": ("raced_distance",), "winning": ("winning_distance",), "owner:": ("owner",),
+    "dog:": ("dog_record",), "horse:": ("dog_record",), "j/t:": ("trainer_stats",),
+    "race": ("racetime",), "sec": ("sectime",), "prize": ("prize",), "margin": ("margin",),
+    **{t: ("track",) for t in _TRACK_WORDS},
+}
+_KEYWORD_PATTERN = "|".join(
+    [re.escape(k) for k in sorted(_KEYWORD_HANDLERS, key=len, reverse=True)]
+    + [r"(?<!\d)\d+(?=st|nd|rd|th|m|\s*kg)"]
+)
+_KEYWORD_RX = re.compile(_KEYWORD_PATTERN)
+_KEYWORD_RX_I = re.compile(_KEYWORD_PATTERN, re.I)
+
+def _scan_block(block: str):
+    """
+    One pass over a dog block. Returns (first match per _FIELD_RX key,
+    last value per _TOKEN_RX key, run start offsets) - the same results as
+    searching the block once per pattern and re.split on run starts.
+    """
+    if block.isascii():
+        low, rx = block.lower(), _KEYWORD_RX
+    else:
+        low, rx = block, _KEYWORD_RX_I  # lower() may shift offsets
+    found, tokens, starts = {}, {}, []
+    m = rx.search(low)
+    while m:
+        pos, end = m.start(), m.end()
+        handlers = _KEYWORD_HANDLERS.get(m.group().lower())
+        if handlers is None:
+            # Digit run: run start ("2nd of 8", also inside "99th"), 401m, 0kg
+            for q in (end - 2, end - 1):
+                if q >= 0 and (not starts or q > starts[-1]) and _RUN_START.match(block, q):
+                    starts.append(q)
+            if end - pos == 3:
+                t = _TOKEN_RX["distance"].match(block, pos)
+                if t and int(t.group(1)) in _KNOWN_DISTANCES:
+                    tokens["distance"] = int(t.group(1))
+            if block[end - 1] == "0" and "colour_sex_age" not in found:
+                f = _FIELD_RX["colour_sex_age"].match(block, end - 1)
+                if f:
+                    found["colour_sex_age"] = f
+        else:
+            for key in handlers:
+                if key in _TOKEN_RX:
+                    t = _TOKEN_RX[key].match(block, pos)
+                    if t:
+                        tokens[key] = t.group(1)
+                elif key not in found:
+                    f = _FIELD_RX[key].match(block, pos)
+                    if f:
+                        found[key] = f
+        # Step one character so keywords overlapping this one are still seen
+        m = rx.search(low, pos + 1)
+    return found, tokens, starts
+
+def _token_fields(tokens):
+    """Token values from _scan_block as the Detected*/Last* fields."""
     out = {
         "DetectedDistance": None,
         "LastPrize": None,
@@ -240,35 +553,14 @@ def _scan_tokens(block: str):
         "LastSecTime": None,
         "LastTrack": None,
     }
-    words = block.split()
-    for i, w in enumerate(words):
-        # Distances like 401m
-        if re.fullmatch(r"\d{3}m", w):
-            d = int(w[:-1])
-            if d in _KNOWN_DISTANCES:
-                out["DetectedDistance"] = d
-        # Prize
-        if w.lower() == "prize" and i+1 < len(words):
-            nxt = words[i+1]
-            if re.match(r"^\$?\d[\d,]*(?:\.\d+)?$", nxt):
-                out["LastPrize"] = nxt.lstrip("$").replace(",", "")
-        # Margin
-        if w.lower() == "margin" and i+1 < len(words):
-            nxt = words[i+1]
-            if re.match(r"^[\d.]+$", nxt):
-                out["LastMargin"] = nxt
-        # Race Time
-        if w.lower() == "time" and i > 0 and words[i-1].lower() == "race":
-            if i+1 < len(words) and re.match(r"^\d+:\d{2}\.\d{2}$", words[i+1]):
-                out["LastRaceTime"] = words[i+1]
-        # Sec Time
-        if w.lower() == "time" and i > 0 and words[i-1].lower() == "sec":
-            if i+1 < len(words) and re.match(r"^\d{1,2}\.\d{2}$", words[i+1]):
-                out["LastSecTime"] = words[i+1]
-        # Track name presence in results lines
-        if w.upper() in {"DARWIN","RICHMOND","WENTWORTH","ALBION","MANDURAH",
-                         "GOSFORD","SANDOWN","CANNINGTON","DUBBO","BATHURST","GRAFTON"}:
-            out["LastTrack"] = w.title()
+    out["DetectedDistance"] = tokens.get("distance")
+    if tokens.get("prize"):
+        out["LastPrize"] = tokens["prize"].lstrip("$").replace(",", "")
+    out["LastMargin"] = tokens.get("margin")
+    out["LastRaceTime"] = tokens.get("racetime")
+    out["LastSecTime"] = tokens.get("sectime")
+    if tokens.get("track"):
+        out["LastTrack"] = tokens["track"].title()
     return out
 
 # Recent runs extractor (list of dicts)
@@ -276,7 +568,7 @@ _RUN_LINE = re.compile(
     r"""
     (?P<pos>\d+(?:st|nd|rd|th))\s+of\s+(?P<field>\d+)\s+
     (?P<date>\d{1,2}/\d{2}/\d{4})\s+
-    (?P<track>[A-Z][A-Za-z]+)\s+
+    (?P<track>[A-Z][A-Za-z]*(?:\s+(?!(?:Margin|Distance|SOT|RST|GR|Race|Prize|API|BP|Odds|Trainer)\b)[A-Z][A-Za-z]*)*)\s+
     (?:Margin\s+(?P<margin>[\d.]+)\s+Lengths\s+)?
     (?:Distance\s+(?P<distance>\d{3})m\s+)?
     (?:SOT\s+(?P<sot>[A-Z])\s+)?
@@ -299,10 +591,31 @@ _RUN_LINE = re.compile(
     re.I | re.X,
 )
 
-def _extract_recent_runs(block: str):
+# Keyword lookups for run fields the chained pattern above skips once one of its
+# optional groups fails (multi-word race names, "Sec Time Adj", "Prize Won" …)
+_RUN_FIELD_RX = {
+    "margin": re.compile(r"\bMargin\s+([\d.]+)\s+Lengths", re.I),
+    "distance": re.compile(r"\bDistance\s+(\d{3})m", re.I),
+    "sot": re.compile(r"\bSOT\s+([A-Z])\b", re.I),
+    "rst": re.compile(r"\bRST\s+([A-Z/]+)", re.I),
+    "grade": re.compile(r"\bGR\s+([\w/]+)", re.I),
+    "prize": re.compile(r"\bPrize\s+\$([\d,]+)", re.I),
+    "api": re.compile(r"\bAPI\s+([\d.]+)", re.I),
+    "racetime": re.compile(r"\bRace\s+Time\s+(\d+:\d{2}\.\d{2})", re.I),
+    "sectime": re.compile(r"\bSec\s+Time\s+(\d{1,2}\.\d+)\b", re.I),
+    "bp": re.compile(r"\bBP\s+(\d+)", re.I),
+    "odds": re.compile(r"\bOdds\s+([\d.]+F?)", re.I),
+    "trainer": re.compile(r"\bTrainer\s+([A-Za-z' -]+?)\s+(?=Ongoing\b|Track\b|Winner\b|Second\b|Third\b|Settled\b|$)"),
+}
+
+def _extract_recent_runs(block: str, starts=None):
+    """Run dicts from a dog block; starts are run start offsets from _scan_block."""
+    if starts is None:
+        starts = _scan_block(block)[2]
+    bounds = [0] + starts + [len(block)]
     runs = []
-    candidates = re.split(r"(?=(?:\d{1,2}(?:st|nd|rd|th)\s+of\s+\d+))", block)
-    for cand in candidates:
+    for a, b in zip(bounds, bounds[1:]):
+        cand = block[a:b]
         cand = cand.strip()
         if not cand:
             continue
@@ -310,11 +623,52 @@ def _extract_recent_runs(block: str):
         if not m:
             continue
         d = m.groupdict()
+        for k, rx in _RUN_FIELD_RX.items():
+            if not d.get(k):
+                mk = rx.search(cand)
+                if mk:
+                    d[k] = mk.group(1)
         if d.get("prize"):
             d["prize"] = d["prize"].replace(",", "")
         runs.append(d)
     return runs
 
+def _runs_frame(dog_ids, runs):
+    """
+    Typed runs table from _extract_recent_runs dicts (runs[i] belongs to
+    dog_ids[i], most recent first). Numbers are numeric, distances Int16,
+    RunIdx counts back from the latest run (0).
+    """
+    def col(k):
+        return pd.Series([r.get(k) for r in runs], dtype=object)
+
+    racetime = col("racetime").str.extract(r"^(\d+):(\d+(?:\.\d+)?)$").astype(float)
+    odds = col("odds")
+    tracks = col("track")
+    track_names = {t: canonical_track(t) for t in set(tracks.dropna())}
+    grades = col("grade")
+    grade_names = {g: canonical_grade(g) for g in set(grades.dropna())}
+    dog_ids = pd.Series(np.asarray(dog_ids, dtype=np.int32))
+    return pd.DataFrame({
+        "DogId": dog_ids,
+        "RunIdx": dog_ids.groupby(dog_ids).cumcount().astype(np.int16),
+        "Position": pd.to_numeric(col("pos").str.extract(r"^(\d+)", expand=False), errors="coerce").astype("Int8"),
+        "FieldSize": pd.to_numeric(col("field"), errors="coerce").astype("Int8"),
+        "RunDate": pd.to_datetime(col("date"), format="%d/%m/%Y", errors="coerce"),
+        "Track": tracks.map(track_names).astype("category"),
+        "Distance": pd.to_numeric(col("distance"), errors="coerce").astype("Int16"),
+        "Grade": grades.map(grade_names).astype("category"),
+        "Trainer": col("trainer").str.strip().astype("category"),
+        "Margin": pd.to_numeric(col("margin"), errors="coerce"),
+        "Prize": pd.to_numeric(col("prize"), errors="coerce").astype("float32"),
+        "API": pd.to_numeric(col("api"), errors="coerce").astype("float32"),
+        "RaceTimeSec": racetime[0] * 60 + racetime[1],
+        "SecTimeSec": pd.to_numeric(col("sectime"), errors="coerce"),
+        "BP": pd.to_numeric(col("bp"), errors="coerce").astype("Int8"),
+        "Odds": pd.to_numeric(odds.str.rstrip("F"), errors="coerce").astype("float32"),
+        "Favourite": odds.str.endswith("F").fillna(False).astype(bool),
+    })
+
 def _extract_fields(block: str):
     out = {
         "Colour": None, "Sex": None, "Age": None,
@@ -331,138 +685,216 @@ def _extract_fields(block: str):
         "RecentRuns": None,
     }
 
-    m = _FIELD_RX["colour_sex_age"].search(block)
+    found, tokens, starts = _scan_block(block)
+
+    m = found.get("colour_sex_age")
     if m:
         out["Colour"] = m.group(1).lower()
         out["Age"] = m.group(2)
         out["Sex"] = "Dog" if m.group(3).upper() == "D" else "Bitch"
 
+    # No keyword to anchor on, so this one still searches the block
     m = _FIELD_RX["sire_dam"].search(block)
     if m:
         out["Sire"] = m.group(1).strip()
         out["Dam"] = m.group(2).strip()
 
-    m = _FIELD_RX["raced_distance"].search(block);   out["RacedDistance"]   = m.group(1) if m else None
-    m = _FIELD_RX["winning_distance"].search(block); out["WinningDistance"] = m.group(1) if m else None
+    m = found.get("raced_distance");   out["RacedDistance"]   = m.group(1) if m else None
+    m = found.get("winning_distance"); out["WinningDistance"] = m.group(1) if m else None
 
-    m = _FIELD_RX["owner"].search(block)
+    m = found.get("owner")
     if m:
         out["Owner"] = re.sub(r"\s+", " ", m.group(1)).strip()
 
-    m = _FIELD_RX["dog_record"].search(block)
+    m = found.get("dog_record")
     if m:
         out["DogRecord"], out["WinPercent"], out["PlacePercent"] = m.group(1), m.group(2), m.group(3)
 
-    m = _FIELD_RX["trainer_stats"].search(block)
+    m = found.get("trainer_stats")
     if m:
         out["Trainer50"], out["Trainer350"] = m.group(1), m.group(2)
 
-    m = _FIELD_RX["api"].search(block);     out["API"]     = m.group(1) if m else None
-    m = _FIELD_RX["carpm"].search(block);   out["CarPM/s"] = m.group(1).replace(",", "") if m else None
-    m = _FIELD_RX["pm12"].search(block);    out["12mPM/s"] = m.group(1) if m else None
-    m = _FIELD_RX["rtc_km"].search(block);  out["RTC/km"]  = m.group(1) if m else None
-    m = _FIELD_RX["rdisttc"].search(block); out["RDistTC"] = m.group(1) if m else None
-    m = _FIELD_RX["dls"].search(block);     out["DLS"]     = m.group(1) if m else None
-    m = _FIELD_RX["dlw"].search(block);     out["DLW"]     = m.group(1) if m else None
-    m = _FIELD_RX["dod"].search(block);     out["DOD"]     = m.group(1) if m else None
+    m = found.get("api");     out["API"]     = m.group(1) if m else None
+    m = found.get("carpm");   out["CarPM/s"] = m.group(1).replace(",", "") if m else None
+    m = found.get("pm12");    out["12mPM/s"] = m.group(1) if m else None
+    m = found.get("rtc_km");  out["RTC/km"]  = m.group(1) if m else None
+    m = found.get("rdisttc"); out["RDistTC"] = m.group(1) if m else None
+    m = found.get("dls");     out["DLS"]     = m.group(1) if m else None
+    m = found.get("dlw");     out["DLW"]     = m.group(1) if m else None
+    m = found.get("dod");     out["DOD"]     = m.group(1) if m else None
 
     for key, col in [("grade_G1","G1"),("grade_G2","G2"),("grade_G3","G3"),
                      ("grade_LR","LR"),("grade_FU","FU"),("grade_2U","2U"),("grade_3U","3U")]:
-        m = _FIELD_RX[key].search(block)
+        m = found.get(key)
         if m:
             out[col] = m.group(1)
 
     # Token scan fallbacks
-    tk = _scan_tokens(block)
+    tk = _token_fields(tokens)
     for k,v in tk.items():
         if v:
             out[k] = v
 
     # Recent runs list
-    runs = _extract_recent_runs(block)
+    runs = _extract_recent_runs(block, starts)
     if runs:
         out["RecentRuns"] = runs
 
     return out
 
 
-def _enrich_section2(df: pd.DataFrame, full_text: str, debug: bool = False) -> pd.DataFrame:
+_SECTION2_COLS = [
+    "Colour", "Sex", "Age", "Sire", "Dam",
+    "RacedDistance", "WinningDistance", "Owner",
+    "DogRecord", "WinPercent", "PlacePercent",
+    "Trainer50", "Trainer350", "CarPM/s", "12mPM/s", "API",
+    "RTC/km", "RDistTC", "DLS", "DLW", "DOD",
+    "G1", "G2", "G3", "LR", "FU", "2U", "3U",
+    "DetectedDistance", "LastPrize", "LastMargin",
+    "LastRaceTime", "LastSecTime", "LastTrack",
+]
+
+def _enrich_section2(df: pd.DataFrame, full_text: str, debug: bool = False) -> tuple[pd.DataFrame, pd.DataFrame]:
     """
-    Enrich header-parsed df with Section 2 details. Adds many new columns and
-    populates df['RecentRuns'] (list-of-dicts). Repairs Distance if missing.
+    Enrich header-parsed df with Section 2 details from the whole card text.
+    Returns (df, runs): df with the Section 2 columns added (Distance
+    repaired where missing) and the typed recent-runs table keyed by
+    df['DogId'].
     """
-    txt = _norm(full_text)
-
-    ensure_cols = [
-        "Colour", "Sex", "Age", "Sire", "Dam",
-        "RacedDistance", "WinningDistance", "Owner",
-        "DogRecord", "WinPercent", "PlacePercent",
-        "Trainer50", "Trainer350", "CarPM/s", "12mPM/s", "API",
-        "RTC/km", "RDistTC", "DLS", "DLW", "DOD",
-        "G1", "G2", "G3", "LR", "FU", "2U", "3U",
-        "DetectedDistance", "LastPrize", "LastMargin",
-        "LastRaceTime", "LastSecTime", "LastTrack",
-        "RecentRuns",
-    ]
-    for c in ensure_cols:
-        if c not in df.columns:
-            df[c] = None
+    stats = {"matched": 0, "missed": 0, "indexed": 0}
+    df, run_dogs, run_rows = _enrich_race(df, _norm(full_text), stats, debug)
+    _report_enrichment(stats, debug)
+    return df, _runs_frame(run_dogs, run_rows)
 
+def _enrich_race(df: pd.DataFrame, txt: str, stats, debug: bool = False):
+    """
+    Enrich df's dogs from the normalized text txt (one race or the whole
+    card). Returns (df, run_dogs, run_rows) for _runs_frame; counts go to stats.
+    """
     names_upper = [str(n).upper().strip() for n in df["DogName"].fillna("")]
-    matched = missed = 0
+    block_index = _build_block_index(txt)
+    candidates = None  # built on the first index miss, then shared
+    dog_ids = df["DogId"] if "DogId" in df.columns else pd.Series(np.arange(len(df)), index=df.index)
+    run_dogs, run_rows = [], []
+    writes = {}  # column -> {index: value}, applied once per column below
 
     for idx, row in df.iterrows():
         name = str(row["DogName"]).upper().strip()
         if not name:
-            missed += 1
+            stats["missed"] += 1
             continue
 
-        block = _find_block(txt, name, names_upper)
+        with stage("block_find"):
+            # Header names can carry a glued form letter ("XFEDERAL ARLO")
+            span = block_index.get(name) or block_index.get(name[1:])
+            block = txt[span[0]:span[1]] if span else None
+            if block:
+                stats["indexed"] += 1
+                count("block_find.index")
+            else:
+                if candidates is None:
+                    candidates = _build_fuzzy_candidates(txt)
+                block = _find_block(txt, name, names_upper, candidates, block_index)
         if not block:
-            missed += 1
+            stats["missed"] += 1
             if debug:
                 print(f"[MISS] {name}")
             continue
 
-        fields = _extract_fields(block)
+        with stage("field_extract"):
+            fields = _extract_fields(block)
 
         # Write back fields
         for k, v in fields.items():
             if k == "RecentRuns":
                 if v:
-                    df.at[idx, "RecentRuns"] = v
+                    run_dogs.extend([dog_ids[idx]] * len(v))
+                    run_rows.extend(v)
             else:
                 if v is not None and v != "":
-                    df.at[idx, k] = v
+                    writes.setdefault(k, {})[idx] = v
 
         # Distance repair from DetectedDistance
         if ("Distance" in df.columns) and (pd.isna(row.get("Distance")) or not row.get("Distance")):
             if fields.get("DetectedDistance"):
-                df.at[idx, "Distance"] = fields["DetectedDistance"]
+                writes.setdefault("Distance", {})[idx] = fields["DetectedDistance"]
 
-        matched += 1
+        stats["matched"] += 1
         if debug:
             print(f"[OK] {name}")
 
+    # New columns are added in one go (inserting them one by one dominates on small races)
+    new_cols = [c for c in _SECTION2_COLS if c not in df.columns]
+    if new_cols:
+        df = pd.concat([df, pd.DataFrame({
+            c: pd.Series([writes.get(c, {}).get(i) for i in df.index], index=df.index, dtype=object)
+            for c in new_cols
+        })], axis=1)
+    for k, vals in writes.items():
+        if k not in new_cols:
+            df.loc[list(vals), k] = list(vals.values())
+
+    return df, run_dogs, run_rows
+
+def _report_enrichment(stats, debug: bool = False):
+    matched, missed, indexed = stats["matched"], stats["missed"], stats["indexed"]
     if debug:
-        print(f"[Section2] Matched={matched} Missed={missed}")
+        print(f"[Section2] Matched={matched} Missed={missed} (index={indexed}, scan={matched - indexed})")
 
     print(f"✅ Enriched {matched} dogs using deep Section 2 parser.")
-    return df
 
 
-# Optional helper to flatten recent runs if you need a separate table
-def explode_recent_runs(df: pd.DataFrame) -> pd.DataFrame:
-    rows = []
-    base_cols = [c for c in df.columns if c != "RecentRuns"]
-    for _, dog in df.iterrows():
-        runs = dog.get("RecentRuns")
-        if not runs:
-            continue
-        base = {c: dog[c] for c in base_cols}
-        for r in runs:
-            rows.append({**base, **r})
-    return pd.DataFrame(rows)
+class RunsJoinView:
+    """
+    Runs joined to their dogs without copying dog columns into every run
+    row. Run columns are returned as-is; dog columns are gathered through
+    DogId only when asked for.
+    """
+
+    def __init__(self, dogs: pd.DataFrame, runs: pd.DataFrame):
+        self.dogs = dogs
+        self.runs = runs
+        # Row position in `dogs` for each run
+        pos = pd.Series(np.arange(len(dogs)), index=dogs["DogId"].to_numpy())
+        self._dog_pos = pos.reindex(runs["DogId"].to_numpy()).to_numpy()
+
+    def __len__(self):
+        return len(self.runs)
+
+    @property
+    def columns(self):
+        return list(self.runs.columns) + [c for c in self.dogs.columns if c not in self.runs.columns]
+
+    def __getitem__(self, col):
+        if col in self.runs.columns:
+            return self.runs[col]
+        values = self.dogs[col].take(self._dog_pos)
+        return pd.Series(values.to_numpy(), index=self.runs.index, name=col)
+
+    def to_frame(self, columns=None):
+        """Materialize the join for the given columns (all by default)."""
+        return pd.DataFrame({c: self[c] for c in (columns or self.columns)})
+
+def join_runs(dogs: pd.DataFrame, runs: pd.DataFrame) -> RunsJoinView:
+    return RunsJoinView(dogs, runs)
+
+def concat_race_cards(cards):
+    """Stack (dogs, runs) pairs from several cards, renumbering DogId so keys stay unique."""
+    all_dogs, all_runs = [], []
+    next_id = 0
+    for dogs, runs in cards:
+        dogs = dogs.copy()
+        runs = runs.copy()
+        remap = pd.Series(np.arange(next_id, next_id + len(dogs), dtype=np.int32), index=dogs["DogId"].to_numpy())
+        dogs["DogId"] = remap.to_numpy()
+        runs["DogId"] = remap.reindex(runs["DogId"].to_numpy()).to_numpy().astype(np.int32)
+        next_id += len(dogs)
+        all_dogs.append(dogs)
+        all_runs.append(runs)
+    runs = pd.concat(all_runs, ignore_index=True)
+    for c in ["Track", "Grade", "Trainer"]:
+        runs[c] = runs[c].astype("category")  # concat falls back to object when categories differ
+    return pd.concat(all_dogs, ignore_index=True), runs
 
 
 # ---------- Local test ----------
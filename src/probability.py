@@ -0,0 +1,126 @@
+# src/probability.py - Exact finishing-order probabilities from FinalScore
+#
+# Win probabilities are a softmax of FinalScore / temperature within each
+# race. Orders follow Harville (Plackett-Luce): the chance that dogs a, b, c
+# run 1-2-3 is p[a] * p[b] / (1 - p[a]) * p[c] / (1 - p[a] - p[b]). Every
+# race is laid out as a row of a (race, slot) matrix padded to the largest
+# field, so all orders of all races are one gather through a precomputed
+# permutation table (336 trifectas / 1680 first fours for 8 slots).
+import itertools
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+from src.config import WIN_TEMPERATURE
+from src.instrument import stage
+
+RACE_KEYS = ["Track", "RaceNumber"]
+BET_TYPES = {"trifecta": 3, "first4": 4}
+
+@lru_cache(maxsize=None)
+def permutation_table(n, k):
+    """Every ordered k-tuple of n slots, shape (n!/(n-k)!, k), in lexicographic order."""
+    perms = np.array(list(itertools.permutations(range(n), k)), dtype=np.intp).reshape(-1, k)
+    perms.setflags(write=False)
+    return perms
+
+def race_matrix(df, column="FinalScore"):
+    """
+    Runners laid out one race per row, best FinalScore first: returns
+    (races, rows, values) with races the (Track, RaceNumber) of each row,
+    rows[r, s] the position in df of slot s of race r (-1 for padding) and
+    values the column at those positions (NaN for padding).
+    """
+    ranked = df[RACE_KEYS + ["FinalScore"]].reset_index(drop=True).dropna(subset=RACE_KEYS)
+    ranked = ranked.sort_values(RACE_KEYS + ["FinalScore"], ascending=[True, True, False], kind="stable")
+    groups = ranked.groupby(RACE_KEYS, sort=False, observed=True)
+    race = groups.ngroup().to_numpy()
+    slot = groups.cumcount().to_numpy()
+    n_races = race.max(initial=-1) + 1
+    rows = np.full((n_races, slot.max(initial=-1) + 1), -1, dtype=np.intp)
+    rows[race, slot] = ranked.index.to_numpy()
+    values = np.full(rows.shape, np.nan)
+    values[race, slot] = df[column].to_numpy(dtype=float)[rows[race, slot]]
+    races = ranked.loc[slot == 0, RACE_KEYS].reset_index(drop=True)
+    return races, rows, values
+
+def win_probabilities(scores, temperature=WIN_TEMPERATURE):
+    """Row-wise softmax of scores / temperature; NaN slots (padding, unscored dogs) get 0."""
+    z = np.where(np.isnan(scores), -np.inf, scores / temperature)
+    top = z.max(axis=1, keepdims=True, initial=-np.inf)
+    e = np.exp(z - np.where(np.isfinite(top), top, 0))
+    total = e.sum(axis=1, keepdims=True)
+    return np.divide(e, total, out=np.zeros_like(e), where=total > 0)
+
+def order_probabilities(p, k):
+    """
+    Harville probability of every ordered k-tuple of slots finishing 1..k,
+    shape (races, n!/(n-k)!) in permutation_table(n, k) order. Tuples that
+    include a padding slot come out 0.
+    """
+    perms = permutation_table(p.shape[1], k)
+    P = p[:, perms]  # (race, order, place)
+    left = 1 - (np.cumsum(P, axis=2) - P)  # probability mass not yet placed ahead
+    with np.errstate(divide="ignore", invalid="ignore"):
+        step = np.where(left > 0, P / left, 0.0)
+    return step.prod(axis=2)
+
+def add_win_probabilities(df, temperature=WIN_TEMPERATURE):
+    """df with a WinProb column: each dog's softmax share of its race."""
+    df = df.copy()
+    _, rows, scores = race_matrix(df)
+    p = win_probabilities(scores, temperature)
+    win = np.full(len(df), np.nan)
+    win[rows[rows >= 0]] = p[rows >= 0]
+    df["WinProb"] = win
+    return df
+
+def exotic_table(df, bet="trifecta", temperature=WIN_TEMPERATURE, top=None):
+    """
+    Every ordering of a race's first k dogs (k = 3 for trifecta, 4 for
+    first4) with its Harville probability, most likely first within each
+    race; top keeps only the top N per race. Columns: Track, RaceNumber,
+    Bet, Rank, Dog1..Dogk, Boxes (e.g. "3-1-5") and Probability.
+    """
+    if bet not in BET_TYPES:
+        raise ValueError(f"Unknown bet '{bet}' (expected one of {', '.join(BET_TYPES)})")
+    k = BET_TYPES[bet]
+    with stage("exotics", len(df)):
+        races, rows, scores = race_matrix(df)
+        if rows.shape[1] < k:
+            return pd.DataFrame(columns=RACE_KEYS + ["Bet", "Rank"] + [f"Dog{i}" for i in range(1, k + 1)]
+                                + ["Boxes", "Probability"])
+        probs = order_probabilities(win_probabilities(scores, temperature), k)
+        perms = permutation_table(rows.shape[1], k)
+        field = (rows >= 0).sum(axis=1)
+
+        order = np.argsort(-probs, axis=1, kind="stable")[:, :top]
+        race = np.repeat(np.arange(len(rows)), order.shape[1])
+        perm = order.ravel()
+        keep = perms[perm].max(axis=1) < field[race]  # drop orders through padding slots
+        race, perm = race[keep], perm[keep]
+        dog_rows = rows[race[:, None], perms[perm]]  # (combination, place)
+
+        rank = np.ones(len(race), dtype=np.int32)
+        if len(race):
+            starts = np.flatnonzero(np.r_[True, race[1:] != race[:-1]])
+            rank = np.arange(len(race)) - np.repeat(starts, np.diff(np.r_[starts, len(race)])) + 1
+
+        names = df["DogName"].to_numpy(dtype=object)
+        out = races.iloc[race].reset_index(drop=True)
+        out["Bet"] = bet
+        out["Rank"] = rank
+        for i in range(k):
+            out[f"Dog{i + 1}"] = names[dog_rows[:, i]]
+        if "Box" in df.columns:
+            boxes = pd.DataFrame(df["Box"].astype("string").to_numpy()[dog_rows])
+            out["Boxes"] = boxes[0].str.cat([boxes[i] for i in range(1, k)], sep="-").to_numpy()
+        out["Probability"] = probs[race, perm]
+    return out
+
+def exotics(df, temperature=WIN_TEMPERATURE, top=None):
+    """exotic_table for every bet type, stacked (trifectas first; Dog4 is empty for them)."""
+    out = pd.concat([exotic_table(df, bet, temperature, top) for bet in BET_TYPES], ignore_index=True)
+    dogs = [f"Dog{i}" for i in range(1, max(BET_TYPES.values()) + 1)]
+    return out[RACE_KEYS + ["Bet", "Rank"] + dogs + [c for c in ["Boxes", "Probability"] if c in out.columns]]
@@ -0,0 +1,116 @@
+# src/profiling.py - Opt-in cProfile / stack-sampling around a pipeline run
+import cProfile
+import datetime
+import io
+import os
+import pstats
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+
+PROFILE_MODES = ("cprofile", "sample")
+
+def profile_dir(root="outputs", date=None):
+    """outputs/<YYYY-MM-DD> for today (or date)."""
+    return os.path.join(root, (date or datetime.date.today()).strftime("%Y-%m-%d"))
+
+class StackSampler:
+    """
+    Samples the calling thread's Python stack every `interval` seconds from a
+    background thread. Cheaper than cProfile on call-heavy code (nothing is
+    hooked per call), at the cost of statistical rather than exact counts.
+    """
+
+    def __init__(self, interval=0.005):
+        self.interval = interval
+        self.stacks = Counter()
+        self._stop = threading.Event()
+        self._thread = None
+        self._target = None
+
+    def start(self):
+        self._target = threading.get_ident()
+        self._thread = threading.Thread(target=self._run, name="stack-sampler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self._target)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append((code.co_filename, code.co_firstlineno, code.co_name))
+                frame = frame.f_back
+            if stack:
+                self.stacks[tuple(reversed(stack))] += 1
+
+    def write_folded(self, path):
+        """Collapsed stacks ("a;b;c count"), the input format of flamegraph tools."""
+        with open(path, "w", encoding="utf-8") as f:
+            for stack, n in self.stacks.most_common():
+                f.write(";".join(f"{name} ({os.path.basename(fn)}:{line})" for fn, line, name in stack))
+                f.write(f" {n}\n")
+
+    def summary(self, top=30):
+        """Top functions by self samples (innermost frame) and by inclusive samples."""
+        total = sum(self.stacks.values())
+        own, incl = Counter(), Counter()
+        for stack, n in self.stacks.items():
+            own[stack[-1]] += n
+            for fn in set(stack):
+                incl[fn] += n
+        lines = [f"{total} samples every {self.interval * 1000:g} ms"]
+        for title, counts in [("self", own), ("inclusive", incl)]:
+            lines.append(f"\nTop {top} by {title} samples:")
+            for (fn, line, name), n in counts.most_common(top):
+                lines.append(f"{n:8d} {100 * n / max(total, 1):6.1f}%  {name} ({fn}:{line})")
+        return "\n".join(lines) + "\n"
+
+@contextmanager
+def profiled(name, out_dir=None, mode="cprofile", top=30, interval=0.005):
+    """
+    Profile the enclosed block and write to out_dir (outputs/<date> by
+    default): with cprofile a <name>-<time>.prof file for pstats/snakeviz,
+    with sample a .folded stack file; both get a <name>-<time>-top.txt
+    hot-function summary. Files are written even if the block raises.
+    """
+    if mode not in PROFILE_MODES:
+        raise ValueError(f"Unknown profile mode '{mode}' (expected one of {', '.join(PROFILE_MODES)})")
+    out_dir = out_dir or profile_dir()
+    base = os.path.join(out_dir, f"{name}-{time.strftime('%H%M%S')}")
+
+    prof = cProfile.Profile() if mode == "cprofile" else StackSampler(interval)
+    if mode == "cprofile":
+        prof.enable()
+    else:
+        prof.start()
+    try:
+        yield prof
+    finally:
+        if mode == "cprofile":
+            prof.disable()
+        else:
+            prof.stop()
+        os.makedirs(out_dir, exist_ok=True)
+        if mode == "cprofile":
+            prof.dump_stats(f"{base}.prof")
+            buf = io.StringIO()
+            stats = pstats.Stats(prof, stream=buf).strip_dirs()
+            stats.sort_stats("cumulative").print_stats(top)
+            stats.sort_stats("tottime").print_stats(top)
+            summary = buf.getvalue()
+            print(f"🔬 Saved profile → {base}.prof")
+        else:
+            prof.write_folded(f"{base}.folded")
+            summary = prof.summary(top)
+            print(f"🔬 Saved stack samples → {base}.folded")
+        with open(f"{base}-top.txt", "w", encoding="utf-8") as f:
+            f.write(summary)
+        print(f"🔬 Saved hot-function summary → {base}-top.txt")
@@ -0,0 +1,52 @@
+# src/simulate.py - Monte Carlo finishing orders from FinalScore
+#
+# Each simulated race adds independent Gumbel noise to FinalScore /
+# temperature and ranks the dogs by the result, which samples finishing
+# orders from the same Plackett-Luce model src/probability.py computes
+# exactly. All races run together as one (race, simulation, slot) array,
+# in chunks of simulations so memory stays bounded.
+import numpy as np
+
+from src.config import SIM_CHUNK_CELLS, SIM_RUNS, SIM_SEED, WIN_TEMPERATURE
+from src.instrument import stage
+from src.probability import race_matrix
+
+PLACE_POSITIONS = 3  # a place is a finish in the first three
+SIM_COLUMNS = ["SimWin", "SimPlace", "SimQuinella", "SimTrifecta"]
+
+def simulate_races(df, n_sims=SIM_RUNS, temperature=WIN_TEMPERATURE, seed=SIM_SEED,
+                   chunk_cells=SIM_CHUNK_CELLS):
+    """
+    Frequencies over n_sims simulated runnings of every race, for the bets
+    on the race's top scorers (the same top three as generate_trifecta_table):
+    SimWin / SimPlace (top pick wins / finishes in the first three),
+    SimQuinella (top two fill the first two places in either order) and
+    SimTrifecta (top three finish 1-2-3 in score order). One row per race
+    with at least three runners. The same seed gives the same frequencies.
+    """
+    races, rows, scores = race_matrix(df)
+    keep = (rows >= 0).sum(axis=1) >= 3
+    races, scores = races[keep].reset_index(drop=True), scores[keep]
+    n_races, n_slots = scores.shape
+    with stage("simulate", n_races * n_sims):
+        z = np.where(np.isnan(scores), -np.inf, scores / temperature).astype(np.float32)
+        rng = np.random.default_rng(seed)
+        counts = np.zeros((n_races, len(SIM_COLUMNS)), dtype=np.int64)
+        chunk = max(1, chunk_cells // max(n_races * n_slots, 1))
+        for start in range(0, n_sims, chunk):
+            size = min(chunk, n_sims - start)
+            u = rng.random((n_races, size, n_slots), dtype=np.float32)
+            with np.errstate(divide="ignore"):
+                keys = z[:, None, :] - np.log(-np.log(u))  # Gumbel-perturbed scores
+            # Finishing position of the top three scorers: dogs ahead of each
+            place = (keys[:, :, None, :] > keys[:, :, :3, None]).sum(axis=3)
+            first, second, third = place[..., 0], place[..., 1], place[..., 2]
+            counts[:, 0] += (first == 0).sum(axis=1)
+            counts[:, 1] += (first < PLACE_POSITIONS).sum(axis=1)
+            counts[:, 2] += ((first < 2) & (second < 2)).sum(axis=1)
+            counts[:, 3] += ((first == 0) & (second == 1) & (third == 2)).sum(axis=1)
+
+    out = races.copy()
+    for i, col in enumerate(SIM_COLUMNS):
+        out[col] = counts[:, i] / n_sims if n_sims else np.nan
+    return out